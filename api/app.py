@@ -1,11 +1,35 @@
 import os, re
+from datetime import timezone
 from decimal import Decimal
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, abort, jsonify, make_response, request, send_file
 from flask_cors import CORS
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
-from models import db, User, Product, CartItem
+from models import db, User, Product, CartItem, Order
+from json_provider import FastJSONProvider
+from config import Settings, install_sqlite_pragmas
+from metrics import init_metrics
+from compression import init_compression, send_precompressed
+from images import FORMATS, WIDTHS, product_images
+from user_cache import UserCache
+from passwords import HashingBusy, PasswordHasher
+from kvstore import store_from_url
+from replica import ReplicaRouter
+from ratelimit import RateLimiter, StoreBackend, TokenBucketBackend
+from werkzeug.middleware.proxy_fix import ProxyFix
+from catalog_cache import CatalogCache, bump_catalog_version, content_etag
+from cart import add_to_cart, apply_cart_ops, cart_summary, missing_products, parse_cart_ops
+from stripe_client import STRIPE_MIN_EXPIRY, CheckoutSessions, cart_hash, configure_stripe
+from inventory import OutOfStock, release, reserve, sweep_expired
+from jobs import enqueue, work
+from orders import housekeeping, save_checkout_lines
+from checkout import CURRENCY, build_line_items, parse_guest_items, products_by_id, to_minor, user_cart_lines
+from catalog_query import parse_fields, project, product_page, wants_page
+from catalog_io import FORMATS as CATALOG_FORMATS, detect_format, export_file, import_file, open_path
+from guest_cart import COOKIE_NAME as GUEST_COOKIE, GuestCarts, apply_guest_ops, merge_guest_cart
+from search import SearchIndex, include_object, parse_limit, postgres_search, query_terms, uses_postgres
+import click
+from flask.cli import AppGroup
 import stripe
 from dotenv import load_dotenv
 load_dotenv()
@@ -14,6 +38,7 @@ EMAIL_RE = re.compile(r"^[^\s@]+@[^\s@]+\.[^\s@]+$")
 
 def create_app():
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
 
     FRONT = os.getenv("FRONTEND_URL")
     if not FRONT:
@@ -24,20 +49,174 @@ def create_app():
             f"https://{os.getenv('CODESPACE_NAME','')}-3000.app.github.dev",
         ]
     CORS(app, resources={r"/api/*": {"origins": FRONT}}, supports_credentials=True)
-    database_url = os.getenv('DATABASE_URL', 'sqlite:///local.db')
-    if database_url.startswith('postgres://'):
-        database_url = database_url.replace('postgres://', 'postgresql://', 1)
-
-    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    settings = Settings.from_env()
+    app.config['SQLALCHEMY_DATABASE_URI'] = settings.database_url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = settings.engine_options()
+    app.config['SQLALCHEMY_BINDS'] = settings.binds()
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'dev-change-me')
     db.init_app(app)
-    Migrate(app, db)
-    JWTManager(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            install_sqlite_pragmas(engine, wal=settings.sqlite_wal)
+    if os.getenv('COMPRESS_ENABLED', '1') == '1':
+        init_compression(app, min_size=int(os.getenv('COMPRESS_MIN_SIZE', '1024')),
+                         level=int(os.getenv('COMPRESS_LEVEL', '6')))
+    if os.getenv('METRICS_ENABLED', '1') == '1':
+        init_metrics(app, db, slow_query_ms=float(os.getenv('SLOW_QUERY_MS', '0')),
+                     token=os.getenv('METRICS_TOKEN'))
+    Migrate(app, db, include_object=include_object)
+    jwt = JWTManager(app)
+    if settings.read_replica_url:
+        pin_store_url = os.getenv('REPLICA_PIN_STORE_URL')
+        if settings.web_concurrency > 1 and (not pin_store_url or pin_store_url.startswith('memory:')):
+            # Con la marca en memoria, el worker que atiende la lectura no ve la escritura de otro
+            raise RuntimeError('READ_REPLICA_URL con WEB_CONCURRENCY > 1 requiere '
+                               'REPLICA_PIN_STORE_URL=redis://... (lee-lo-que-escribes entre workers)')
+        ReplicaRouter(
+            db, store_from_url(pin_store_url, max_keys=100000, prefix='senda:replica:'),
+            max_lag=settings.replica_max_lag,
+            check_interval=float(os.getenv('REPLICA_CHECK_INTERVAL', '2')),
+            sticky_seconds=settings.replica_sticky_seconds,
+        ).init_app(app)
+    hasher = PasswordHasher.from_env()
+
+    # Render va detrás de un proxy: la IP real llega en X-Forwarded-For
+    if int(os.getenv('TRUSTED_PROXIES', '0')):
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(os.getenv('TRUSTED_PROXIES')))
+
+    ratelimit_url = os.getenv('RATELIMIT_STORE_URL')
+    limiter = RateLimiter(
+        StoreBackend(store_from_url(ratelimit_url)) if ratelimit_url else TokenBucketBackend(),
+        enabled=os.getenv('RATELIMIT_ENABLED', '1') == '1',
+    )
+    LOGIN_IP_RATE = os.getenv('LOGIN_IP_RATE', '20/minute')
+    LOGIN_EMAIL_RATE = os.getenv('LOGIN_EMAIL_RATE', '5/minute')
+    REGISTER_IP_RATE = os.getenv('REGISTER_IP_RATE', '5/hour')
+
+    def too_many(wait):
+        return jsonify(msg='Demasiados intentos, espera un momento'), 429, {'Retry-After': str(wait)}
+
+    @app.errorhandler(HashingBusy)
+    def hashing_busy(_e):
+        return jsonify(msg='Servidor ocupado, inténtalo de nuevo'), 503, {'Retry-After': '1'}
+    # Con varios workers la revocación necesita un almacén compartido o, sin él, la BD
+    user_store_url = os.getenv('USER_CACHE_STORE_URL')
+    shared_user_store = bool(user_store_url) and not user_store_url.startswith('memory:')
+    users = UserCache(
+        ttl=int(os.getenv('USER_CACHE_TTL', '60')),
+        versions=store_from_url(user_store_url, prefix='senda:user:') if shared_user_store else None,
+        check_db=settings.web_concurrency > 1 and not shared_user_store,
+    )
+    app.extensions['user_cache'] = users
+
+    @jwt.token_in_blocklist_loader
+    def token_revoked(jwt_header, jwt_payload):
+        # Token revocado si el usuario ya no existe o cambió su token_version
+        uid, tv = int(jwt_payload['sub']), jwt_payload.get('tv', 0)
+        current = users.token_version(uid)
+        if current != tv:
+            current = users.token_version(uid, fresh=True)  # ¿valor viejo? decide la BD
+        return current is None or current != tv
+
+    def issue_token(user):
+        return create_access_token(identity=str(user.id), additional_claims={
+            'name': user.name or '', 'email': user.email, 'tv': user.token_version or 0,
+        })
+
+    catalog = CatalogCache(
+        ttl=int(os.getenv('CATALOG_CACHE_TTL', '300')),
+        check_interval=float(os.getenv('CATALOG_VERSION_CHECK', '5')),
+        encode=app.json.dumps_bytes,
+    )
+    app.extensions['catalog_cache'] = catalog
+
+    @app.cli.command('catalog-flush')
+    def catalog_flush():
+        # Invalida la caché en todos los workers (la versión vive en BD)
+        bump_catalog_version(); db.session.commit()
+        catalog.flush()
+        print('Caché de catálogo invalidada ✅')
+
+    catalog_cli = AppGroup('catalog', help='Importar/exportar el catálogo (CSV o JSONL)')
+
+    @catalog_cli.command('import')
+    @click.argument('path')
+    @click.option('--format', 'fmt', type=click.Choice(CATALOG_FORMATS), help='Por defecto, según la extensión')
+    @click.option('--batch-size', type=int, default=1000, show_default=True)
+    @click.option('--prices-only', is_flag=True, help='Solo actualiza el precio de slugs existentes')
+    def catalog_import(path, fmt, batch_size, prices_only):
+        # Upsert por slug; '-' lee de stdin. Las filas sin cambios no se reescriben.
+        log = lambda msg: click.echo(msg, err=True)
+        try:
+            with open_path(path, 'r') as fh:
+                stats = import_file(fh, detect_format(path, fmt), batch_size, prices_only, log)
+        except ValueError as e:
+            raise click.UsageError(str(e))
+        click.echo(f"{stats['rows']} filas en {stats['seconds']}s ({stats['rows_per_sec']}/s): "
+                   f"{stats['inserted']} nuevas, {stats['updated']} actualizadas, {stats['unchanged']} sin cambios, "
+                   f"{stats['missing']} slugs desconocidos, {stats['invalid']} inválidas")
+
+    @catalog_cli.command('export')
+    @click.argument('path')
+    @click.option('--format', 'fmt', type=click.Choice(CATALOG_FORMATS), help='Por defecto, según la extensión')
+    def catalog_export(path, fmt):
+        try:
+            fmt = detect_format(path, fmt) if path != '-' else fmt or 'jsonl'
+        except ValueError as e:
+            raise click.UsageError(str(e))
+        with open_path(path, 'w') as fh:
+            n = export_file(fh, fmt)
+        click.echo(f'{n} productos exportados', err=True)
+
+    app.cli.add_command(catalog_cli)
 
-    stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
+    configure_stripe()
+    checkout_sessions = CheckoutSessions(ttl=int(os.getenv('STRIPE_SESSION_CACHE_TTL', '600')))
     PUBLIC_API_ORIGIN = os.getenv('PUBLIC_API_ORIGIN')
+    CHECKOUT_MAX_LINES = int(os.getenv('CHECKOUT_MAX_LINES', '50'))
     FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:5173')
+    RESERVATION_TTL = int(os.getenv('STOCK_RESERVATION_TTL', '1900'))
+
+    # Carritos de invitado: cookie firmada + almacén clave-valor. Un almacén en memoria es
+    # por proceso: con varios workers y sin redis:// las líneas van en la propia cookie
+    GUEST_CART_TTL = int(os.getenv('GUEST_CART_TTL', str(7 * 24 * 3600)))
+    GUEST_COOKIE_SAMESITE = os.getenv('GUEST_CART_COOKIE_SAMESITE', 'Lax')
+    guest_store_url = os.getenv('GUEST_CART_STORE_URL')
+    shared_guest_store = bool(guest_store_url) and not guest_store_url.startswith('memory:')
+    guest_carts = GuestCarts(
+        store_from_url(guest_store_url, max_keys=int(os.getenv('GUEST_CART_MAX_CARTS', '50000')),
+                       prefix='senda:gc:') if shared_guest_store or settings.web_concurrency <= 1 else None,
+        secret=app.config['JWT_SECRET_KEY'], ttl=GUEST_CART_TTL, max_lines=CHECKOUT_MAX_LINES,
+    )
+
+    def start_checkout(owner, lines, line_items, success_url, cancel_url, metadata):
+        """Reserva el stock y crea la sesión de Stripe; si Stripe falla, libera la reserva."""
+        key = cart_hash(owner, line_items, success_url, cancel_url)
+        wanted = {}
+        for p, qty in lines:
+            wanted[p.id] = wanted.get(p.id, 0) + int(qty)
+        # Antes de reservar: su commit caduca los Product y leerlos después costaría una consulta por línea
+        charged = [(p.id, p.name, to_minor(p.price), int(qty)) for p, qty in lines]
+        try:
+            # ref única por reserva: un carrito ya pagado y vuelto a comprar no hereda nada
+            ref, expires_at, created = reserve(key, wanted, RESERVATION_TTL, owner=owner)
+        except OutOfStock as e:
+            return jsonify(msg=str(e), product_id=e.product_id), 409
+        if created:
+            save_checkout_lines(ref, charged)  # el webhook crea el pedido con estas líneas y precios
+        metadata = {**metadata, 'reservation': ref}
+        # Siempre la caducidad de la reserva original (también en reintentos), si Stripe la admite
+        session_expiry = (expires_at.replace(tzinfo=timezone.utc).timestamp()
+                          if RESERVATION_TTL >= STRIPE_MIN_EXPIRY else None)
+        try:
+            url = checkout_sessions.create(ref, line_items, success_url, cancel_url, metadata,
+                                           expires_at=session_expiry)
+            return jsonify(url=url)
+        except Exception as e:
+            if created:
+                release(ref)  # una reserva de un intento anterior puede tener su sesión viva
+            return jsonify(msg=str(e)), 500
 
     @app.get('/api/health')
     def health():
@@ -46,6 +225,9 @@ def create_app():
     # ---------- AUTH ----------
     @app.post('/api/auth/register')
     def register():
+        wait = limiter.check((f'register:ip:{request.remote_addr}', REGISTER_IP_RATE))
+        if wait:
+            return too_many(wait)
         data = request.get_json() or {}
         email = (data.get('email') or '').strip().lower()
         password = data.get('password') or ''
@@ -58,7 +240,7 @@ def create_app():
             return jsonify(msg='La contraseña debe tener al menos 6 caracteres'), 400
         if User.query.filter_by(email=email).first():
             return jsonify(msg='Email ya registrado'), 409
-        user = User(email=email, password_hash=generate_password_hash(password), name=name)
+        user = User(email=email, password_hash=hasher.hash(password), name=name)
         db.session.add(user); db.session.commit()
         return jsonify(msg='Registrado'), 201
 
@@ -67,19 +249,36 @@ def create_app():
         data = request.get_json() or {}
         email = (data.get('email') or '').strip().lower()
         password = data.get('password') or ''
+        # Antes de tocar la BD o el hash: por IP y por email normalizado
+        wait = limiter.check((f'login:ip:{request.remote_addr}', LOGIN_IP_RATE),
+                             (f'login:email:{email}', LOGIN_EMAIL_RATE))
+        if wait:
+            return too_many(wait)
         user = User.query.filter_by(email=email).first()
-        if not user or not check_password_hash(user.password_hash, password):
+        if not user or not hasher.verify(user.password_hash, password):
             return jsonify(msg='Credenciales inválidas'), 401
-        token = create_access_token(identity=str(user.id))  # sub como string
-        return jsonify(access_token=token, name=user.name or '', email=user.email)
+        if hasher.needs_rehash(user.password_hash):
+            # Hash con parámetros antiguos: se actualiza aprovechando la contraseña en claro
+            user.password_hash = hasher.hash(password)
+            db.session.commit()
+        token = issue_token(user)  # sub como string + claims name/email/tv
+        # Si venía de un carrito de invitado, se fusiona con el suyo
+        guest_id, guest_lines = guest_carts.open(request.cookies.get(GUEST_COOKIE))
+        merged = merge_guest_cart(guest_carts, guest_id, guest_lines, user.id) if guest_id else 0
+        resp = jsonify(access_token=token, name=user.name or '', email=user.email, cart_merged=merged)
+        if guest_id:
+            resp.delete_cookie(GUEST_COOKIE, samesite=GUEST_COOKIE_SAMESITE)
+        return resp
 
     # ---------- PERFIL ----------
     @app.get('/api/me')
     @jwt_required()
     def me():
-        uid = int(get_jwt_identity())
-        u = User.query.get_or_404(uid)
-        return jsonify(id=u.id, name=u.name, email=u.email, created_at=u.created_at.isoformat())
+        # Sin consulta: el usuario ya está en caché tras validar el token
+        u = users.get(int(get_jwt_identity()))
+        if u is None:
+            abort(404)
+        return jsonify(id=u['id'], name=u['name'], email=u['email'], created_at=u['created_at'])
 
     @app.put('/api/me')
     @jwt_required()
@@ -98,14 +297,18 @@ def create_app():
         current_password = data.get('current_password')
         new_password = data.get('new_password')
         if new_password:
-            if not current_password or not check_password_hash(u.password_hash, current_password):
+            if not current_password or not hasher.verify(u.password_hash, current_password):
                 return jsonify(msg='Contraseña actual incorrecta'), 401
             if len(new_password) < 6:
                 return jsonify(msg='La nueva contraseña debe tener al menos 6 caracteres'), 400
-            u.password_hash = generate_password_hash(new_password)
+            u.password_hash = hasher.hash(new_password)
+            u.token_version = (u.token_version or 0) + 1  # cierra las demás sesiones
 
         u.name = name; u.email = email
         db.session.commit()
+        users.bump(uid, u.token_version)
+        if new_password:
+            return jsonify(msg='Perfil actualizado', access_token=issue_token(u))
         return jsonify(msg='Perfil actualizado')
 
     @app.delete('/api/me')
@@ -114,60 +317,157 @@ def create_app():
         uid = int(get_jwt_identity())
         u = User.query.get_or_404(uid)
         CartItem.query.filter_by(user_id=u.id).delete()
+        Order.query.filter_by(user_id=u.id).update({'user_id': None})  # se conservan los pedidos
         db.session.delete(u); db.session.commit()
+        users.bump(uid, None)
         return jsonify(msg='Cuenta eliminada')
 
     # ---------- PRODUCTOS ----------
+    CATALOG_CACHE_CONTROL = os.getenv('CATALOG_CACHE_CONTROL', 'public, max-age=60, stale-while-revalidate=300')
+
+    def catalog_response(payload, etag, last_modified, body=None):
+        # Validadores fuertes: si el cliente/CDN ya tiene esta versión -> 304 sin cuerpo
+        # contains_weak: la versión comprimida lleva el mismo ETag marcado como débil (W/)
+        if etag and request.if_none_match.contains_weak(etag):
+            resp = app.response_class(status=304)
+        elif body is not None:
+            resp = app.json.response_bytes(body)  # JSON precodificado en caché
+            resp.compressed_variants = catalog.compressed(etag)  # br/gzip también en caché
+        else:
+            resp = jsonify(payload)
+        resp.set_etag(etag)
+        if last_modified:
+            resp.last_modified = last_modified.replace(tzinfo=timezone.utc)
+        resp.headers['Cache-Control'] = CATALOG_CACHE_CONTROL
+        return resp.make_conditional(request)
+
     @app.get('/api/products')
     def list_products():
-        products = Product.query.order_by(Product.id.asc()).all()
-        def to_dict(p):
-            return {
-                'id': p.id, 'name': p.name, 'slug': p.slug,
-                'price': float(p.price), 'short_description': p.short_description,
-                'usage': p.usage, 'warnings': p.warnings, 'image': p.image,
-            }
-        return jsonify([to_dict(p) for p in products])
+        try:
+            fields = parse_fields(request.args.get('fields'))
+            if wants_page(request.args):
+                items, next_cursor = product_page(request.args, fields)
+                payload = {'items': items, 'next_cursor': next_cursor}
+                return catalog_response(payload, content_etag(payload), None)
+        except ValueError as e:
+            return jsonify(msg=str(e)), 400
+        products = catalog.products()
+        etag, lm = catalog.validators()
+        if fields:
+            products = [project(p, fields) for p in products]
+            etag = content_etag(products)
+            return catalog_response(products, etag, lm)
+        return catalog_response(products, etag, lm, body=catalog.body())
+
+    search_index = SearchIndex()
+
+    @app.get('/api/products/search')
+    def search_products():
+        # ?q=carb&limit=10&fields=id,name -> productos ordenados por relevancia
+        try:
+            fields = parse_fields(request.args.get('fields'))
+            limit = parse_limit(request.args.get('limit'))
+        except ValueError as e:
+            return jsonify(msg=str(e)), 400
+        terms = query_terms(request.args.get('q'))
+        if not terms:
+            return jsonify(msg='Falta el parámetro q'), 400
+        if uses_postgres():
+            ids = postgres_search(terms, limit)
+        else:
+            search_index.ensure(catalog.products(), catalog.version)
+            ids = search_index.search(terms, limit)
+        items = [project(p, fields) for p in map(catalog.product_by_id, ids) if p]
+        payload = {'items': items}
+        return catalog_response(payload, content_etag(payload), None)
 
     @app.get('/api/products/<slug>')
     def get_product(slug):
-        p = Product.query.filter_by(slug=slug).first_or_404()
-        return jsonify({
-            'id': p.id, 'name': p.name, 'slug': p.slug,
-            'price': float(p.price), 'short_description': p.short_description,
-            'usage': p.usage, 'warnings': p.warnings, 'image': p.image,
-        })
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify(msg=str(e)), 400
+        p = catalog.product(slug)
+        if p is None:
+            abort(404)
+        etag, lm = catalog.validators(slug)
+        if fields:
+            p = project(p, fields)
+            return catalog_response(p, content_etag(p), lm)
+        return catalog_response(p, etag, lm, body=catalog.body(slug))
 
     # ---------- CARRITO ----------
     def cart_item_dict(ci: CartItem, product: Product):
-        price = Decimal(product.price)
-        line_total = price * ci.qty
+        # Importes exactos: céntimos enteros (*_minor) + Decimal, que el proveedor JSON emite como número
+        unit_minor = to_minor(product.price)
         return {
             'id': ci.id, 'product_id': product.id, 'qty': ci.qty,
             'product': {
                 'id': product.id, 'name': product.name, 'slug': product.slug,
-                'price': float(product.price), 'image': product.image,
+                'price': Decimal(unit_minor) / 100, 'image': product_images.versioned(product.image),
                 'short_description': product.short_description
             },
-            'line_total': float(line_total)
+            'line_total': Decimal(unit_minor * ci.qty) / 100,
+            'line_total_minor': unit_minor * ci.qty,
         }
 
-    @app.get('/api/cart')
-    @jwt_required()
-    def cart_list():
-        uid = int(get_jwt_identity())
-        items = CartItem.query.filter_by(user_id=uid).all()
-        payload, subtotal = [], Decimal('0.00')
+    def cart_payload(uid):
+        # Una sola consulta: líneas + producto (LEFT OUTER JOIN)
+        items = (CartItem.query
+                 .options(db.joinedload(CartItem.product))
+                 .filter_by(user_id=uid)
+                 .order_by(CartItem.id.asc())
+                 .all())
+        payload, subtotal_minor, item_count, orphans = [], 0, 0, []
         for ci in items:
-            p = Product.query.get(ci.product_id)
+            p = ci.product
             if not p:
-                db.session.delete(ci)
+                orphans.append(ci.id)
                 continue
             d = cart_item_dict(ci, p)
-            subtotal += Decimal(str(d['line_total']))
+            subtotal_minor += d['line_total_minor']
+            item_count += ci.qty
             payload.append(d)
+        # Limpieza de líneas huérfanas en un único DELETE, y solo si hace falta
+        if orphans:
+            CartItem.query.filter(CartItem.id.in_(orphans)).delete(synchronize_session=False)
+            db.session.commit()
+        return dict(items=payload, subtotal=Decimal(subtotal_minor) / 100, subtotal_minor=subtotal_minor,
+                    item_count=item_count, currency=CURRENCY)
+
+    @app.get('/api/cart')
+    @jwt_required()
+    def cart_list():
+        return jsonify(cart_payload(int(get_jwt_identity())))
+
+    @app.get('/api/cart/summary')
+    @jwt_required()
+    def cart_summary_get():
+        # Para el badge de la cabecera: solo totales, sin detalle de productos
+        summary = cart_summary(int(get_jwt_identity()))
+        resp = jsonify(summary)
+        resp.set_etag(content_etag(summary))
+        resp.headers['Cache-Control'] = 'private, no-cache'
+        return resp.make_conditional(request)
+
+    CART_BATCH_MAX = int(os.getenv('CART_BATCH_MAX', '100'))
+
+    @app.patch('/api/cart')
+    @jwt_required()
+    def cart_patch():
+        # Lote de operaciones {op: add|set|remove, product_id, qty} en una transacción
+        uid = int(get_jwt_identity())
+        data = request.get_json(silent=True) or {}
+        try:
+            ops = parse_cart_ops(data.get('ops'), CART_BATCH_MAX)
+        except ValueError as e:
+            return jsonify(msg=str(e)), 400
+        missing = missing_products(pid for op, pid, _ in ops if op != 'remove')
+        if missing:
+            return jsonify(msg='Producto no existe', product_ids=missing), 404
+        apply_cart_ops(uid, ops)
         db.session.commit()
-        return jsonify(items=payload, subtotal=float(subtotal))
+        return jsonify(cart_payload(uid))
 
     @app.post('/api/cart')
     @jwt_required()
@@ -178,15 +478,90 @@ def create_app():
         qty = int(data.get('qty') or 1)
         if not product_id: return jsonify(msg='product_id requerido'), 400
         if qty < 1: return jsonify(msg='qty debe ser >= 1'), 400
-        p = Product.query.get(product_id)
-        if not p: return jsonify(msg='Producto no existe'), 404
-        existing = CartItem.query.filter_by(user_id=uid, product_id=product_id).first()
-        if existing:
-            existing.qty += qty; ci = existing
-        else:
-            ci = CartItem(user_id=uid, product_id=product_id, qty=qty); db.session.add(ci)
+        if not db.session.query(Product.id).filter_by(id=product_id).first():
+            return jsonify(msg='Producto no existe'), 404
+        item_id = add_to_cart(uid, product_id, qty)
         db.session.commit()
-        return jsonify(msg='Añadido al carrito', id=ci.id), 201
+        return jsonify(msg='Añadido al carrito', id=item_id), 201
+
+    # ---------- CARRITO invitado (cookie firmada, sin BD) ----------
+    def guest_cart_payload(lines):
+        # Productos y precios desde la caché de catálogo: ninguna consulta
+        items, subtotal_minor, item_count = [], 0, 0
+        for pid, qty in lines.items():
+            p = catalog.product_by_id(pid)
+            if p is None:
+                continue
+            unit_minor = to_minor(p['price'])
+            items.append({
+                'product_id': pid, 'qty': qty,
+                'product': {k: p[k] for k in ('id', 'name', 'slug', 'price', 'image', 'short_description')},
+                'line_total': Decimal(unit_minor * qty) / 100,
+                'line_total_minor': unit_minor * qty,
+            })
+            subtotal_minor += unit_minor * qty
+            item_count += qty
+        return dict(items=items, subtotal=Decimal(subtotal_minor) / 100, subtotal_minor=subtotal_minor,
+                    item_count=item_count, currency=CURRENCY)
+
+    def set_guest_cookie(resp, cart_id, lines=None):
+        resp.set_cookie(GUEST_COOKIE, guest_carts.sign(cart_id, lines), max_age=GUEST_CART_TTL, httponly=True,
+                        secure=request.is_secure or GUEST_COOKIE_SAMESITE == 'None',
+                        samesite=GUEST_COOKIE_SAMESITE)
+        return resp
+
+    def guest_cart_response(cart_id, lines, status=200):
+        resp = jsonify(guest_cart_payload(lines))
+        resp.status_code = status
+        return set_guest_cookie(resp, cart_id, lines)
+
+    def unknown_products(pids):
+        return sorted({pid for pid in pids if catalog.product_by_id(pid) is None})
+
+    @app.get('/api/guest/cart')
+    def guest_cart_get():
+        cart_id, lines = guest_carts.open(request.cookies.get(GUEST_COOKIE))
+        if cart_id is None:
+            return jsonify(guest_cart_payload({}))
+        return guest_cart_response(cart_id, lines)
+
+    @app.post('/api/guest/cart')
+    def guest_cart_add():
+        data = request.get_json(silent=True) or {}
+        try:
+            ops = parse_cart_ops([{'op': 'add', 'product_id': data.get('product_id'), 'qty': data.get('qty', 1)}], 1)
+        except ValueError as e:
+            return jsonify(msg=str(e)), 400
+        return guest_cart_apply(ops, 201)
+
+    @app.patch('/api/guest/cart')
+    def guest_cart_patch():
+        data = request.get_json(silent=True) or {}
+        try:
+            ops = parse_cart_ops(data.get('ops'), CART_BATCH_MAX)
+        except ValueError as e:
+            return jsonify(msg=str(e)), 400
+        return guest_cart_apply(ops)
+
+    def guest_cart_apply(ops, status=200):
+        missing = unknown_products(pid for op, pid, _ in ops if op != 'remove')
+        if missing:
+            return jsonify(msg='Producto no existe', product_ids=missing), 404
+        cart_id, current = guest_carts.open(request.cookies.get(GUEST_COOKIE))
+        cart_id = cart_id or guest_carts.new_id()
+        try:
+            lines = apply_guest_ops(current, ops, guest_carts.max_lines)
+        except ValueError as e:
+            return jsonify(msg=str(e)), 400
+        guest_carts.save(cart_id, lines)
+        return guest_cart_response(cart_id, lines, status)
+
+    @app.delete('/api/guest/cart')
+    def guest_cart_clear():
+        guest_carts.delete(guest_carts.open(request.cookies.get(GUEST_COOKIE))[0])
+        resp = jsonify(guest_cart_payload({}))
+        resp.delete_cookie(GUEST_COOKIE, samesite=GUEST_COOKIE_SAMESITE)
+        return resp
 
     @app.put('/api/cart/<int:item_id>')
     @jwt_required()
@@ -228,52 +603,57 @@ def create_app():
             return jsonify(msg='Stripe no configurado'), 500
 
         uid = int(get_jwt_identity())
-        items = CartItem.query.filter_by(user_id=uid).all()
-        if not items:
+        lines = user_cart_lines(uid)
+        if not lines:
             return jsonify(msg='Carrito vacío'), 400
 
         origin = PUBLIC_API_ORIGIN or (request.host_url.rstrip('/'))
-
-        line_items = []
-        for ci in items:
-            p = Product.query.get(ci.product_id)
-            if not p: continue
-            image_abs = f"{origin}{p.image}" if p.image and p.image.startswith('/api/') else None
-            price_cents = int(Decimal(str(p.price)) * 100)
-            li = {
-                "quantity": int(ci.qty),
-                "price_data": {
-                    "currency": "chf",
-                    "unit_amount": price_cents,
-                    "product_data": { "name": p.name }
-                }
-            }
-            if image_abs:
-                li["price_data"]["product_data"]["images"] = [image_abs]
-            line_items.append(li)
+        line_items = build_line_items(lines, origin)
 
         payload = request.get_json() or {}
         success_url = payload.get('success_url') or f"{FRONTEND_URL}/success?session_id={{CHECKOUT_SESSION_ID}}"
         cancel_url  = payload.get('cancel_url')  or f"{FRONTEND_URL}/cart"
 
-        try:
-            session = stripe.checkout.Session.create(
-                mode="payment",
-                line_items=line_items,
-                success_url=success_url,
-                cancel_url=cancel_url,
-                allow_promotion_codes=True,
-                billing_address_collection="auto"
-            )
-            return jsonify(url=session.url)
-        except Exception as e:
-            return jsonify(msg=str(e)), 500
+        # El webhook recupera el usuario de los metadata; las líneas, de checkout_line
+        metadata = {'user_id': str(uid)}
+        return start_checkout(f"user:{uid}", lines, line_items, success_url, cancel_url, metadata)
 
     # Estáticos de productos
+    IMAGE_MAX_AGE = int(os.getenv('IMAGE_MAX_AGE', '3600'))
+
     @app.get('/api/static/products/<path:filename>')
     def product_static(filename):
-        root = os.path.join(app.root_path, 'static', 'products')
-        return send_from_directory(root, filename)
+        # ?w=<ancho>&fm=webp|jpeg|auto -> variante redimensionada (caché en disco)
+        width = request.args.get('w', type=int)
+        fmt = request.args.get('fm')
+        if width is not None and width not in WIDTHS:
+            return jsonify(msg=f"w debe ser uno de: {', '.join(map(str, WIDTHS))}"), 400
+        if fmt == 'auto':
+            fmt = 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpeg'
+        elif fmt is not None and fmt not in FORMATS:
+            return jsonify(msg=f"fm debe ser uno de: {', '.join(FORMATS)}, auto"), 400
+
+        if (width or fmt) and product_images.can_resize:
+            try:
+                path = product_images.variant(filename, width, fmt or 'jpeg')
+            except FileNotFoundError:
+                abort(404)
+            resp = send_file(path, mimetype=FORMATS[fmt or 'jpeg'][1], conditional=True)
+            if request.args.get('fm') == 'auto':
+                resp.vary.add('Accept')
+        else:
+            resp = send_precompressed(product_images.root, filename)
+
+        # URL con el hash del contenido actual -> inmutable; el resto, caché corta
+        version = request.args.get('v')
+        resp.cache_control.no_cache = None  # send_file lo pone por defecto
+        resp.cache_control.public = True
+        if version and version == product_images.content_hash(filename):
+            resp.cache_control.max_age = 31536000
+            resp.cache_control.immutable = True
+        else:
+            resp.cache_control.max_age = IMAGE_MAX_AGE
+        return resp
 
     # ---------- CHECKOUT invitado (sin JWT) ----------
     @app.post('/api/checkout/session_guest')
@@ -283,9 +663,17 @@ def create_app():
             return jsonify(msg='Stripe no configurado'), 500
 
         data = request.get_json(silent=True) or {}
-        items_in = data.get('items') or []
-        if not isinstance(items_in, list) or not items_in:
-            return jsonify(msg='items requerido (lista de {product_id, qty})'), 400
+        guest_id, guest_lines = guest_carts.open(request.cookies.get(GUEST_COOKIE))
+        if data.get('items') is None and guest_id:
+            # Carrito ya guardado (almacén o cookie firmada): no hay nada que revalidar del cliente
+            wanted = guest_lines
+            if not wanted:
+                return jsonify(msg='Carrito vacío'), 400
+        else:
+            try:
+                wanted = parse_guest_items(data.get('items'), CHECKOUT_MAX_LINES)
+            except ValueError as e:
+                return jsonify(msg=str(e)), 400
 
         # URLs de retorno
         success_url = data.get('success_url') or f"{FRONTEND_URL}/success?session_id={{CHECKOUT_SESSION_ID}}"
@@ -294,48 +682,49 @@ def create_app():
         # Origen absoluto para imágenes
         origin = PUBLIC_API_ORIGIN or (request.host_url.rstrip('/'))
 
-        line_items = []
-        for it in items_in:
-            try:
-                pid = int(it.get('product_id'))
-                qty = int(it.get('qty') or 1)
-            except Exception:
-                return jsonify(msg='product_id/qty inválidos'), 400
-            if qty < 1:
-                return jsonify(msg='qty debe ser >= 1'), 400
-
-            p = Product.query.get(pid)
-            if not p:
-                return jsonify(msg=f'Producto {pid} no existe'), 404
-
-            price_cents = int(Decimal(str(p.price)) * 100)
-            image_abs = f"{origin}{p.image}" if p.image and p.image.startswith('/api/') else None
-
-            li = {
-                "quantity": qty,
-                "price_data": {
-                    "currency": "chf",
-                    "unit_amount": price_cents,
-                    "product_data": { "name": p.name }
-                }
-            }
-            if image_abs:
-                li["price_data"]["product_data"]["images"] = [image_abs]
-            line_items.append(li)
-
+        # Todos los productos en una sola consulta
+        products = products_by_id(wanted)
+        missing = [pid for pid in wanted if pid not in products]
+        if missing:
+            return jsonify(msg=f'Producto {missing[0]} no existe'), 404
+        lines = [(products[pid], qty) for pid, qty in wanted.items()]
+        line_items = build_line_items(lines, origin)
+
+        # Sin usuario: el "dueño" es el id aleatorio de la cookie de invitado. Si no la trae,
+        # se le emite una; así sus reintentos reutilizan la sesión y nunca la de otro cliente.
+        issued = None if guest_id else guest_carts.new_id()
+        resp = make_response(start_checkout(f"guest:{guest_id or issued}", lines, line_items,
+                                            success_url, cancel_url, {}))
+        return set_guest_cookie(resp, issued) if issued else resp
+
+
+    # ---------- WEBHOOK Stripe ----------
+    @app.post('/api/stripe/webhook')
+    def stripe_webhook():
+        # Solo verificar y encolar: el pedido lo crea `flask jobs-work` en segundo plano
+        secret = os.getenv('STRIPE_WEBHOOK_SECRET')
+        if not secret:
+            return jsonify(msg='Webhook no configurado'), 500
+        payload = request.get_data()
         try:
-            session = stripe.checkout.Session.create(
-                mode="payment",
-                line_items=line_items,
-                success_url=success_url,
-                cancel_url=cancel_url,
-                allow_promotion_codes=True,
-                billing_address_collection="auto"
-            )
-            return jsonify(url=session.url)
-        except Exception as e:
-            return jsonify(msg=str(e)), 500
-
+            event = stripe.Webhook.construct_event(payload, request.headers.get('Stripe-Signature'), secret)
+        except (ValueError, stripe.SignatureVerificationError):
+            return jsonify(msg='Firma inválida'), 400
+        enqueue('stripe_event', payload.decode('utf-8'), event_id=event['id'])
+        db.session.commit()
+        return jsonify(received=True)
+
+    @app.cli.command('jobs-work')
+    @click.option('--once', is_flag=True, help='Procesa lo pendiente y termina')
+    @click.option('--max-jobs', type=int, default=None)
+    def jobs_work(once, max_jobs):
+        n = work(once=once, max_jobs=max_jobs, periodic=housekeeping)
+        print(f'{n} jobs procesados')
+
+    @app.cli.command('stock-sweep')
+    def stock_sweep():
+        # Libera reservas caducadas (también lo hace `jobs-work` mientras está ocioso)
+        print(f'{sweep_expired()} reservas liberadas')
 
     return app
 
@@ -0,0 +1,203 @@
+"""Benchmark de la API: latencia, throughput y consultas SQL por endpoint.
+
+    cd api && python -m bench.api --products 2000 --users 20000 --cart-lines 40000 --out sqlite.json
+    python -m bench.api --database-url postgresql://localhost/senda_bench --out pg.json
+    python -m bench.api --compare sqlite-antes.json sqlite.json
+
+Sin --database-url usa un SQLite temporal. La base se crea y se siembra desde cero
+(¡no apuntar a una base con datos reales!). Stripe es fake_stripe.py en local, así
+que el checkout mide nuestro código + la latencia simulada (--stripe-latency).
+Las peticiones van por el test client de Flask (en proceso): sin ruido de red,
+reproducible entre commits. Las consultas por petición salen de Server-Timing.
+"""
+import argparse, json, logging, os, platform, random, re, subprocess, sys, tempfile, time
+from concurrent.futures import ThreadPoolExecutor
+
+QUERIES_RE = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+SEARCH_WORDS = ('carb', 'lavanda', 'menta', 'coco', 'rosa', 'miel', 'fresco', 'piel seca')
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return sorted_values[min(int(len(sorted_values) * p), len(sorted_values) - 1)]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def setup(args):
+    """Entorno, fake Stripe, app y datos. Devuelve (app, server de Stripe, slugs, ids)."""
+    from fake_stripe import start_fake_stripe
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # sin una línea por llamada a Stripe
+    server, base = start_fake_stripe(latency=args.stripe_latency)
+    os.environ.update({
+        'DATABASE_URL': args.database_url,
+        'STRIPE_API_BASE': base, 'STRIPE_SECRET_KEY': 'sk_test_bench',
+        'STRIPE_SESSION_CACHE_TTL': '0',  # cada checkout llega a Stripe
+        'RATELIMIT_ENABLED': '0', 'METRICS_ENABLED': '1', 'SLOW_QUERY_MS': '0',
+    })
+    from app import create_app
+    from models import db, Product
+    from seed_products import PRODUCTS, seed_synthetic
+
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for p in PRODUCTS:
+            db.session.add(Product(**p))
+        db.session.commit()
+        t0 = time.perf_counter()
+        seed_synthetic(args.products, args.users, args.cart_lines, password=args.password, seed=args.seed)
+        seconds = time.perf_counter() - t0
+        slugs = [s for s, in db.session.query(Product.slug)]
+        ids = [i for i, in db.session.query(Product.id)]
+    print(f'sembrado en {seconds:.1f}s', file=sys.stderr)
+    return app, server, slugs, ids
+
+
+def login(client, i, password):
+    r = client.post('/api/auth/login', json={'email': f'bench{i}@example.com', 'password': password})
+    return {'Authorization': f"Bearer {r.get_json()['access_token']}"}
+
+
+def scenarios(args, slugs, ids):
+    """nombre -> función(client, headers, rng, i) que hace UNA petición y devuelve la respuesta."""
+    return {
+        'catalog_list': lambda c, h, rng, i: c.get('/api/products'),
+        'catalog_page': lambda c, h, rng, i: c.get('/api/products?limit=24&sort=price&fields=id,name,price,image'),
+        'product_detail': lambda c, h, rng, i: c.get(f'/api/products/{rng.choice(slugs)}'),
+        'search': lambda c, h, rng, i: c.get('/api/products/search', query_string={'q': rng.choice(SEARCH_WORDS)}),
+        'login': lambda c, h, rng, i: c.post('/api/auth/login', json={
+            'email': f'bench{rng.randint(1, max(args.users, 1))}@example.com', 'password': args.password}),
+        'me': lambda c, h, rng, i: c.get('/api/me', headers=h),
+        'cart_get': lambda c, h, rng, i: c.get('/api/cart', headers=h),
+        'cart_add': lambda c, h, rng, i: c.post('/api/cart', json={'product_id': rng.choice(ids), 'qty': 1}, headers=h),
+        'checkout': lambda c, h, rng, i: (
+            c.patch('/api/cart', json={'ops': [{'op': 'set', 'product_id': ids[0], 'qty': 1 + i % 50}]}, headers=h),
+            c.post('/api/checkout/session', json={}, headers=h))[1],
+    }
+
+
+def run_scenario(app, fn, requests, threads, auth, seed):
+    """Lanza `requests` peticiones repartidas entre `threads` clientes. Devuelve el informe."""
+    per_thread = [requests // threads + (1 if t < requests % threads else 0) for t in range(threads)]
+
+    def client(t):
+        rng = random.Random(seed + t)
+        c = app.test_client()
+        h = auth[t % len(auth)] if auth else {}
+        samples = []
+        for i in range(per_thread[t]):
+            t0 = time.perf_counter()
+            resp = fn(c, h, rng, i)
+            elapsed = time.perf_counter() - t0
+            m = QUERIES_RE.search(resp.headers.get('Server-Timing', ''))
+            samples.append((elapsed, int(m.group(1)) if m else None, resp.status_code))
+        return samples
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as ex:
+        samples = [s for chunk in ex.map(client, range(threads)) for s in chunk]
+    wall = time.perf_counter() - start
+
+    latencies = sorted(s[0] for s in samples)
+    queries = [s[1] for s in samples if s[1] is not None]
+    ms = lambda v: None if v is None else round(v * 1000, 2)
+    return {
+        'requests': len(samples), 'errors': sum(1 for s in samples if s[2] >= 400),
+        'rps': round(len(samples) / wall, 1) if wall else None,
+        'p50_ms': ms(percentile(latencies, 0.50)), 'p95_ms': ms(percentile(latencies, 0.95)),
+        'p99_ms': ms(percentile(latencies, 0.99)), 'max_ms': ms(latencies[-1] if latencies else None),
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def compare(old_path, new_path, threshold):
+    """Diferencias de p95/queries entre dos informes; sale con 1 si algo empeora > threshold."""
+    with open(old_path) as fh:
+        old = json.load(fh)
+    with open(new_path) as fh:
+        new = json.load(fh)
+    worse = False
+    print(f"{'escenario':<16}{'p95 antes':>11}{'p95 ahora':>11}{'cambio':>9}{'queries':>13}")
+    for name, cur in new['results'].items():
+        prev = old['results'].get(name)
+        if not prev:
+            continue
+        change = (cur['p95_ms'] - prev['p95_ms']) / prev['p95_ms'] if prev['p95_ms'] else 0.0
+        q = f"{prev['queries_per_request']}->{cur['queries_per_request']}"
+        flag = ' !' if change > threshold or (cur['queries_per_request'] or 0) > (prev['queries_per_request'] or 0) else ''
+        worse = worse or bool(flag)
+        print(f"{name:<16}{prev['p95_ms']:>11}{cur['p95_ms']:>11}{change:>+9.0%}{q:>13}{flag}")
+    return 1 if worse else 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', default=os.getenv('BENCH_DATABASE_URL'))
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--cart-lines', type=int, default=40000)
+    parser.add_argument('--requests', type=int, default=500, help='peticiones por escenario')
+    parser.add_argument('--login-requests', type=int, default=50, help='login es caro a propósito (scrypt)')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--sessions', type=int, default=16, help='usuarios logueados para los escenarios con JWT')
+    parser.add_argument('--stripe-latency', type=float, default=0.0)
+    parser.add_argument('--password', default='secret123')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--only', action='append', help='escenario a ejecutar (repetible)')
+    parser.add_argument('--out', help='fichero JSON de salida (por defecto stdout)')
+    parser.add_argument('--compare', nargs=2, metavar=('ANTES', 'AHORA'))
+    parser.add_argument('--threshold', type=float, default=0.2, help='empeoramiento de p95 tolerado en --compare')
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+    args.database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+    app, server, slugs, ids = setup(args)
+    try:
+        c = app.test_client()
+        auth = [login(c, i, args.password) for i in range(1, min(args.sessions, args.users) + 1)]
+        results = {}
+        for name, fn in scenarios(args, slugs, ids).items():
+            if args.only and name not in args.only:
+                continue
+            needs_auth = name in ('me', 'cart_get', 'cart_add', 'checkout')
+            if needs_auth and not auth or name == 'login' and not args.users:
+                continue
+            n = args.login_requests if name == 'login' else args.requests
+            fn(c, auth[0] if auth else {}, random.Random(args.seed), 0)  # calentamiento (cachés)
+            results[name] = run_scenario(app, fn, n, args.threads, auth if needs_auth else None, args.seed)
+            print(f'{name}: {json.dumps(results[name])}', file=sys.stderr)
+        with app.app_context():
+            from models import db
+            dialect = db.engine.dialect.name
+    finally:
+        server.shutdown()
+
+    report = {
+        'meta': {
+            'commit': git_commit(), 'database': dialect, 'python': platform.python_version(),
+            'threads': args.threads, 'products': len(ids), 'users': args.users,
+            'cart_lines': args.cart_lines, 'stripe_latency': args.stripe_latency, 'seed': args.seed,
+        },
+        'results': results,
+    }
+    out = json.dumps(report, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, 'w') as fh:
+            fh.write(out + '\n')
+    else:
+        print(out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Throughput de login (verificación de contraseña) con distintos costes de hash.
+
+    cd api && python -m bench.passwords --threads 4 --seconds 3
+"""
+import argparse, json, time
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash
+from passwords import PasswordHasher
+
+METHODS = [
+    'pbkdf2:sha256:260000',
+    'pbkdf2:sha256:600000',
+    'scrypt:16384:8:1',
+    'scrypt:32768:8:1',
+]
+
+
+def bench(method, workers, threads, seconds):
+    hasher = PasswordHasher(method=method, workers=workers, max_pending=threads)
+    stored = generate_password_hash('secret123', method)
+    deadline = time.perf_counter() + seconds
+    latencies = []
+
+    def client():
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            hasher.verify(stored, 'secret123')
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as ex:
+        for _ in range(threads):
+            ex.submit(client)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'method': method, 'workers': workers, 'clients': threads,
+        'logins_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 1),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 1),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=2, help='hilos del pool de hash')
+    parser.add_argument('--threads', type=int, default=4, help='clientes concurrentes')
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--method', action='append', help='repetible; por defecto varios costes')
+    args = parser.parse_args()
+    for method in args.method or METHODS:
+        print(json.dumps(bench(method, args.workers, args.threads, args.seconds)))
@@ -0,0 +1,98 @@
+"""Coste de serialización por endpoint: antes (dicts + float + jsonify) vs ahora.
+
+    cd api && python -m bench.serialization --products 500 --cart-lines 30
+"""
+import argparse, json, timeit
+from decimal import Decimal
+from types import SimpleNamespace
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from json_provider import FastJSONProvider, orjson
+
+
+def fake_products(n):
+    return [SimpleNamespace(
+        id=i, name=f'Jabón {i}', slug=f'jabon-{i}', price=Decimal('8.90') + i % 7,
+        short_description='Estallido cítrico y vitalizante para empezar el día.' * 2,
+        usage='Aplicar sobre piel húmeda, masajear y enjuagar.' * 3,
+        warnings='Evitar contacto con los ojos. Uso externo.', image=f'/api/static/products/{i}.jpg',
+    ) for i in range(1, n + 1)]
+
+
+def old_product(p):
+    return {'id': p.id, 'name': p.name, 'slug': p.slug, 'price': float(p.price),
+            'short_description': p.short_description, 'usage': p.usage,
+            'warnings': p.warnings, 'image': p.image}
+
+
+def old_cart(lines):
+    payload, subtotal = [], Decimal('0.00')
+    for qty, p in lines:
+        d = {'id': p.id, 'product_id': p.id, 'qty': qty,
+             'product': {'id': p.id, 'name': p.name, 'slug': p.slug, 'price': float(p.price),
+                         'image': p.image, 'short_description': p.short_description},
+             'line_total': float(Decimal(p.price) * qty)}
+        subtotal += Decimal(str(d['line_total']))
+        payload.append(d)
+    return {'items': payload, 'subtotal': float(subtotal)}
+
+
+def new_cart(lines):
+    payload, subtotal = [], Decimal('0.00')
+    for qty, p in lines:
+        price = Decimal(p.price)
+        d = {'id': p.id, 'product_id': p.id, 'qty': qty,
+             'product': {'id': p.id, 'name': p.name, 'slug': p.slug, 'price': price,
+                         'image': p.image, 'short_description': p.short_description},
+             'line_total': price * qty}
+        subtotal += d['line_total']
+        payload.append(d)
+    return {'items': payload, 'subtotal': subtotal}
+
+
+def per_call_us(fn, number):
+    return round(min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--cart-lines', type=int, default=30)
+    parser.add_argument('--number', type=int, default=200)
+    args = parser.parse_args()
+
+    old_app, new_app = Flask('old'), Flask('new')
+    new_app.json = FastJSONProvider(new_app)
+    assert isinstance(old_app.json, DefaultJSONProvider)
+
+    products = fake_products(args.products)
+    lines = [(2, p) for p in products[:args.cart_lines]]
+    # Lo que guarda CatalogCache: dicts + bytes precodificados
+    cached = [old_product(p) for p in products]
+    list_body = new_app.json.dumps_bytes(cached)
+    detail_body = new_app.json.dumps_bytes(cached[0])
+
+    results = {}
+    with old_app.app_context():
+        results['GET /api/products'] = {'before_us': per_call_us(
+            lambda: old_app.json.response([old_product(p) for p in products]), args.number)}
+        results['GET /api/products/<slug>'] = {'before_us': per_call_us(
+            lambda: old_app.json.response(old_product(products[0])), args.number)}
+        results['GET /api/cart'] = {'before_us': per_call_us(
+            lambda: old_app.json.response(old_cart(lines)), args.number)}
+    with new_app.app_context():
+        results['GET /api/products']['after_us'] = per_call_us(
+            lambda: new_app.json.response_bytes(list_body), args.number)
+        results['GET /api/products/<slug>']['after_us'] = per_call_us(
+            lambda: new_app.json.response_bytes(detail_body), args.number)
+        results['GET /api/cart']['after_us'] = per_call_us(
+            lambda: new_app.json.response(new_cart(lines)), args.number)
+
+    for r in results.values():
+        r['speedup'] = round(r['before_us'] / r['after_us'], 1) if r['after_us'] else None
+    print(json.dumps({'orjson': orjson is not None, 'products': args.products,
+                      'cart_lines': args.cart_lines, 'endpoints': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
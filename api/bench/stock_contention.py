@@ -0,0 +1,85 @@
+"""Muchos clientes compitiendo por el mismo SKU: comprueba que no hay sobreventa.
+
+    cd api && python -m bench.stock_contention --threads 32 --attempts 200 --stock 50
+    DATABASE_URL=postgresql://... python -m bench.stock_contention
+
+Sin DATABASE_URL usa un SQLite temporal. Cada intento reserva 1 unidad con un
+carrito distinto; al final deben haberse vendido exactamente `stock` unidades y el
+stock debe quedar en 0 (nunca negativo). p95/max altos delatarían un convoy de
+bloqueos sobre la fila del producto.
+"""
+import argparse, json, os, sys, tempfile, time, uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+def bench(threads, attempts, stock, qty):
+    from app import create_app
+    from models import db, Product, StockReservation
+    from inventory import OutOfStock, reserve, sweep_expired
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        name = f'bench-{uuid.uuid4().hex[:8]}'
+        product = Product(name=name, slug=name, price=1, stock=stock)
+        db.session.add(product)
+        db.session.commit()
+        pid = product.id
+
+    def client(i):
+        with app.app_context():
+            t0 = time.perf_counter()
+            try:
+                reserve(uuid.uuid4().hex, {pid: qty}, ttl=60)
+                ok = True
+            except OutOfStock:
+                ok = False
+            finally:
+                db.session.remove()
+            return ok, time.perf_counter() - t0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as ex:
+        results = list(ex.map(client, range(attempts)))
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        left = db.session.get(Product, pid).stock
+        held = (db.session.query(db.func.coalesce(db.func.sum(StockReservation.qty), 0))
+                .filter_by(product_id=pid, status='held').scalar())
+        # Caducadas a mano: el barrido debe devolverlo todo
+        StockReservation.query.filter_by(product_id=pid).update({'expires_at': db.func.current_timestamp()})
+        db.session.commit()
+        swept = 0
+        while (n := sweep_expired()):
+            swept += n
+        restored = db.session.get(Product, pid).stock
+
+    latencies = sorted(t for _, t in results)
+    sold = sum(qty for ok, _ in results if ok)
+    report = {
+        'threads': threads, 'attempts': attempts, 'stock': stock, 'qty': qty,
+        'sold': sold, 'rejected': sum(1 for ok, _ in results if not ok),
+        'stock_left': left, 'held': held, 'restored_after_sweep': restored,
+        'reservations_per_sec': round(attempts / elapsed, 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 1),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 1),
+        'max_ms': round(latencies[-1] * 1000, 1),
+    }
+    report['oversold'] = sold > stock or left < 0 or held != sold or sold + left != stock
+    report['ok'] = not report['oversold'] and restored == stock and sold == min(stock, attempts * qty) // qty * qty
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--attempts', type=int, default=200)
+    parser.add_argument('--stock', type=int, default=50)
+    parser.add_argument('--qty', type=int, default=1, help='unidades por reserva')
+    args = parser.parse_args()
+    if not os.getenv('DATABASE_URL'):
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'stock.db')
+    report = bench(args.threads, args.attempts, args.stock, args.qty)
+    print(json.dumps(report))
+    sys.exit(0 if report['ok'] else 1)
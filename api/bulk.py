@@ -0,0 +1,26 @@
+from sqlalchemy import insert
+
+
+def insert_batches(session, model, rows, batch_size=1000, commit=False):
+    """INSERT multi-fila de un iterable de dicts, de `batch_size` en `batch_size`.
+
+    Con `commit` hace commit tras cada lote (cargas largas que no deben quedar en
+    una sola transacción). Devuelve cuántas filas. Sin dependencias de la app:
+    también lo usa src/api/commands.py.
+    """
+    n, chunk = 0, []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= batch_size:
+            n += _flush(session, model, chunk, commit)
+            chunk = []
+    if chunk:
+        n += _flush(session, model, chunk, commit)
+    return n
+
+
+def _flush(session, model, chunk, commit):
+    session.execute(insert(model), chunk)
+    if commit:
+        session.commit()
+    return len(chunk)
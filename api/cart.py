@@ -0,0 +1,94 @@
+from sqlalchemy import Integer, cast, func
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, CartItem, Product
+from checkout import CURRENCY, format_minor
+
+_UPSERT_DIALECTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def add_to_cart(uid, product_id, qty, replace=False):
+    """Suma `qty` a la línea (uid, product_id), creándola si no existe. Devuelve el id.
+
+    Con `replace=True` la cantidad se sustituye en vez de sumarse.
+
+    En Postgres/SQLite es un único INSERT ... ON CONFLICT DO UPDATE apoyado en el
+    índice único (user_id, product_id): sin select previo ni líneas duplicadas
+    cuando llegan dos "añadir" a la vez.
+    """
+    insert = _UPSERT_DIALECTS.get(db.engine.dialect.name)
+    if insert is None:
+        ci = CartItem.query.filter_by(user_id=uid, product_id=product_id).first()
+        if ci:
+            ci.qty = qty if replace else ci.qty + qty
+        else:
+            ci = CartItem(user_id=uid, product_id=product_id, qty=qty); db.session.add(ci)
+        db.session.flush()
+        return ci.id
+    stmt = insert(CartItem).values(user_id=uid, product_id=product_id, qty=qty)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CartItem.user_id, CartItem.product_id],
+        set_={'qty': stmt.excluded.qty if replace else CartItem.qty + stmt.excluded.qty},
+    ).returning(CartItem.id)
+    return db.session.execute(stmt).scalar_one()
+
+
+CART_OPS = ('add', 'set', 'remove')
+
+
+def parse_cart_ops(ops, max_ops):
+    """Valida la lista de operaciones de PATCH /api/cart -> [(op, product_id, qty)]."""
+    if not isinstance(ops, list) or not ops:
+        raise ValueError('ops requerido (lista de {op, product_id, qty})')
+    if len(ops) > max_ops:
+        raise ValueError(f'Máximo {max_ops} operaciones por petición')
+    parsed = []
+    for it in ops:
+        try:
+            op = it.get('op')
+            pid = int(it.get('product_id'))
+            qty = int(it.get('qty', 1)) if op != 'remove' else 0
+        except (AttributeError, TypeError, ValueError):
+            raise ValueError('product_id/qty inválidos')
+        if op not in CART_OPS:
+            raise ValueError(f"op debe ser uno de: {', '.join(CART_OPS)}")
+        if op == 'add' and qty < 1:
+            raise ValueError('qty debe ser >= 1')
+        parsed.append((op, pid, qty))
+    return parsed
+
+
+def missing_products(product_ids):
+    """IDs que no existen, resueltos con una sola consulta IN."""
+    ids = set(product_ids)
+    if not ids:
+        return []
+    found = {pid for (pid,) in db.session.query(Product.id).filter(Product.id.in_(ids))}
+    return sorted(ids - found)
+
+
+def apply_cart_ops(uid, ops):
+    """Aplica las operaciones ya validadas en la transacción actual (sin commit)."""
+    for op, pid, qty in ops:
+        if op == 'remove' or (op == 'set' and qty < 1):
+            CartItem.query.filter_by(user_id=uid, product_id=pid).delete(synchronize_session=False)
+        else:
+            add_to_cart(uid, pid, qty, replace=(op == 'set'))
+
+
+def cart_summary(uid):
+    """Totales del carrito en una única consulta agregada, sin cargar productos.
+
+    El precio se pasa a céntimos enteros dentro de la consulta (ROUND(price * 100)),
+    así la suma es exacta también en SQLite, que guarda NUMERIC como REAL.
+    """
+    unit_minor = cast(func.round(Product.price * 100), Integer)
+    lines, items, subtotal = (db.session.query(
+        func.count(CartItem.id),
+        func.coalesce(func.sum(CartItem.qty), 0),
+        func.coalesce(func.sum(CartItem.qty * unit_minor), 0),
+    ).join(Product, Product.id == CartItem.product_id).filter(CartItem.user_id == uid).one())
+    return {
+        'line_count': int(lines), 'item_count': int(items),
+        'subtotal_minor': int(subtotal), 'subtotal': format_minor(int(subtotal)),
+        'currency': CURRENCY,
+    }
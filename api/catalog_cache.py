@@ -0,0 +1,150 @@
+import hashlib, json, threading, time
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+from models import db, Product, CatalogVersion
+from images import product_images
+
+
+def product_dict(p: Product):
+    # price sale como Decimal: FastJSONProvider lo escribe como número exacto (8.90, no 8.9000001)
+    return {
+        'id': p.id, 'name': p.name, 'slug': p.slug,
+        'price': p.price, 'short_description': p.short_description,
+        'usage': p.usage, 'warnings': p.warnings, 'image': product_images.versioned(p.image),
+    }
+
+
+def content_etag(payload):
+    if isinstance(payload, bytes):
+        raw = payload
+    else:
+        raw = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False,
+                         default=str).encode('utf-8')  # Decimal -> '8.90'
+    return hashlib.sha256(raw).hexdigest()[:32]
+
+
+def last_modified(p: Product):
+    return p.updated_at or p.created_at
+
+
+# ---------- Versión del catálogo (compartida entre workers vía BD) ----------
+def read_catalog_version():
+    row = db.session.get(CatalogVersion, 1)
+    return row.version if row else 0
+
+
+def bump_catalog_version(session=None):
+    session = session or db.session
+    res = session.execute(
+        update(CatalogVersion).where(CatalogVersion.id == 1)
+        .values(version=CatalogVersion.version + 1)
+    )
+    if res.rowcount == 0:
+        session.add(CatalogVersion(id=1, version=1))
+
+
+@event.listens_for(Session, 'before_flush')
+def _bump_on_product_change(session, flush_context, instances):
+    # Cualquier alta/cambio/baja de Product invalida la caché de todos los workers
+    touched = (*session.new, *session.dirty, *session.deleted)
+    if any(isinstance(o, Product) for o in touched) and not session.info.get('catalog_bumped'):
+        session.info['catalog_bumped'] = True
+        bump_catalog_version(session)
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _reset_bump_flag(session):
+    session.info.pop('catalog_bumped', None)
+
+
+# ---------- Caché en memoria (una por worker de gunicorn) ----------
+class CatalogCache:
+    def __init__(self, ttl=300, check_interval=5, encode=None):
+        self.ttl = ttl                    # refresco completo como máximo cada `ttl` s
+        self.check_interval = check_interval  # cada cuánto se consulta la versión
+        self.encode = encode              # dict -> bytes JSON (respuestas precodificadas)
+        self._lock = threading.Lock()
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            self._products = None
+            self._by_slug = {}
+            self._by_id = {}
+            self._validators = {}
+            self._list_validators = (None, None)
+            self._bodies = {}
+            self._list_body = None
+            self._compressed = {}
+            self._version = None
+            self._loaded_at = 0.0
+            self._checked_at = 0.0
+
+    @property
+    def version(self):
+        self._ensure_fresh()
+        return self._version
+
+    def products(self):
+        self._ensure_fresh()
+        return self._products
+
+    def product(self, slug):
+        self._ensure_fresh()
+        return self._by_slug.get(slug)
+
+    def product_by_id(self, pid):
+        self._ensure_fresh()
+        return self._by_id.get(pid)
+
+    def body(self, slug=None):
+        """JSON ya codificado del listado o de un producto; llamar tras products()/product()."""
+        if slug is None:
+            return self._list_body
+        return self._bodies.get(slug)
+
+    def compressed(self, etag):
+        """{codificación: bytes} del cuerpo con ese ETag; lo rellena init_compression.
+
+        Por ETag (hash del contenido) y no por slug: si el catálogo se recarga entre
+        body() y esta llamada, como mucho se pierde la caché, nunca se mezclan cuerpos.
+        """
+        return self._compressed.setdefault(etag, {})
+
+    def validators(self, slug=None):
+        """(etag, last_modified) del listado o de un producto; llamar tras products()/product()."""
+        if slug is None:
+            return self._list_validators
+        return self._validators.get(slug, (None, None))
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._products is not None and now - self._loaded_at < self.ttl:
+            if now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            if read_catalog_version() == self._version:
+                return
+        self._load(now)
+
+    def _load(self, now):
+        with self._lock:
+            version = read_catalog_version()
+            rows = Product.query.order_by(Product.id.asc()).all()
+            products = [product_dict(p) for p in rows]
+            encode = self.encode or (lambda d: None)
+            bodies = {d['slug']: encode(d) for d in products}
+            list_body = encode(products)
+            validators = {d['slug']: (content_etag(bodies[d['slug']] or d), last_modified(p))
+                          for d, p in zip(products, rows)}
+            stamps = [lm for _, lm in validators.values() if lm]
+            self._products = products
+            self._by_slug = {p['slug']: p for p in products}
+            self._by_id = {p['id']: p for p in products}
+            self._bodies, self._list_body = bodies, list_body
+            self._compressed = {}
+            self._validators = validators
+            self._list_validators = (content_etag(list_body or products), max(stamps) if stamps else None)
+            self._version = version
+            self._loaded_at = self._checked_at = now
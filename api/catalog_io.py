@@ -0,0 +1,234 @@
+import contextlib, csv, io, json, sys, time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import bindparam, insert, select, text, update
+from models import db, Product
+from catalog_cache import bump_catalog_version
+
+COLUMNS = ('slug', 'name', 'price', 'short_description', 'usage', 'warnings', 'image', 'stock')
+REQUIRED = ('slug', 'name', 'price')
+FORMATS = ('csv', 'jsonl')
+MAX_REPORTED_ERRORS = 10
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    if path.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if path.endswith('.csv'):
+        return 'csv'
+    raise ValueError('No se reconoce el formato por la extensión: usa --format csv|jsonl')
+
+
+@contextlib.contextmanager
+def open_path(path, mode):
+    """Fichero o '-' (stdin/stdout), siempre en texto UTF-8."""
+    if path == '-':
+        yield sys.stdin if 'r' in mode else sys.stdout
+    else:
+        with open(path, mode, encoding='utf-8', newline='') as fh:
+            yield fh
+
+
+def read_records(fh, fmt):
+    """Genera (nº de línea, dict) sin cargar el fichero entero en memoria."""
+    if fmt == 'csv':
+        reader = csv.DictReader(fh)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for lineno, line in enumerate(fh, 1):
+        if line.strip():
+            try:
+                yield lineno, json.loads(line)
+            except ValueError:
+                yield lineno, None
+
+
+def clean_row(record, columns):
+    """Normaliza un registro a las `columns` del import; ValueError si no es válido."""
+    if not isinstance(record, dict):
+        raise ValueError('registro ilegible')
+    row = {}
+    for col in columns:
+        value = record.get(col)
+        if isinstance(value, str):
+            value = value.strip()
+        if value in ('', None):
+            value = None
+        elif col == 'price':
+            try:
+                value = Decimal(str(value)).quantize(Decimal('0.01'))
+            except InvalidOperation:
+                raise ValueError(f'price inválido: {value!r}')
+        elif col == 'stock':
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f'stock inválido: {value!r}')
+        row[col] = value
+    for col in REQUIRED:
+        if col in row and row[col] is None:
+            raise ValueError(f'{col} vacío')
+    if row.get('price') is not None and row['price'] < 0:
+        raise ValueError('price negativo')
+    return row
+
+
+def _copy_rows(table, columns, rows):
+    """COPY ... FROM STDIN (Postgres): mucho más rápido que INSERTs sueltos."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for r in rows:
+        writer.writerow(['' if r[c] is None else r[c] for c in columns])  # vacío sin comillas = NULL
+    buf.seek(0)
+    cols = ', '.join(f'"{c}"' for c in columns)
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert(f'COPY {table} ({cols}) FROM STDIN WITH (FORMAT csv)', buf)
+
+
+def _insert_rows(rows, columns):
+    now = datetime.utcnow()
+    rows = [{**r, 'created_at': now, 'updated_at': now} for r in rows]
+    if db.engine.dialect.name == 'postgresql':
+        _copy_rows('product', [*columns, 'created_at', 'updated_at'], rows)
+    else:
+        db.session.execute(insert(Product.__table__), rows)
+
+
+def _update_rows(rows, columns):
+    """Actualiza por slug solo las columnas del import (y updated_at)."""
+    if db.engine.dialect.name == 'postgresql':
+        cols = ', '.join(f'"{c}"' for c in ('slug', *columns))
+        db.session.execute(text(
+            f'CREATE TEMP TABLE catalog_stage ON COMMIT DROP AS SELECT {cols} FROM product WITH NO DATA'
+        ))
+        _copy_rows('catalog_stage', ['slug', *columns], rows)
+        assignments = ', '.join(f'"{c}" = s."{c}"' for c in columns)
+        db.session.execute(text(
+            f'UPDATE product p SET {assignments}, updated_at = now() '
+            f'FROM catalog_stage s WHERE p.slug = s.slug'
+        ))
+        return
+    table = Product.__table__
+    stmt = (update(table).where(table.c.slug == bindparam('match_slug'))
+            .values({**{c: bindparam(f'new_{c}') for c in columns}, 'updated_at': datetime.utcnow()}))
+    db.session.execute(stmt, [{**{f'new_{c}': r[c] for c in columns}, 'match_slug': r['slug']} for r in rows])
+
+
+def apply_batch(rows, columns, stats, prices_only=False, update_existing=True):
+    """Upsert por slug de un lote {slug: row}. Las filas idénticas a la BD no se reescriben.
+
+    Sin `update_existing` solo se insertan los slugs nuevos; los existentes no se tocan (`skipped`).
+    """
+    compared = [c for c in columns if c != 'slug']
+    current = {r.slug: r for r in db.session.execute(
+        select(Product.slug, *(getattr(Product, c) for c in compared)).where(Product.slug.in_(list(rows)))
+    )}
+    new, changed = [], []
+    for slug, row in rows.items():
+        cur = current.get(slug)
+        if cur is None:
+            if prices_only:
+                stats['missing'] += 1
+            else:
+                new.append(row)
+        elif not update_existing:
+            stats['skipped'] += 1
+        elif any(getattr(cur, c) != row[c] for c in compared):
+            changed.append(row)
+        else:
+            stats['unchanged'] += 1
+    if new:
+        _insert_rows(new, columns)
+    if changed:
+        _update_rows(changed, compared)
+    stats['inserted'] += len(new)
+    stats['updated'] += len(changed)
+
+
+def import_records(records, columns, batch_size=1000, prices_only=False, log=None, update_existing=True):
+    """Importa (lineno, dict) en lotes con commit por lote. Devuelve estadísticas.
+
+    Con `prices_only` solo se comparan/actualizan precios de slugs existentes;
+    los slugs desconocidos se cuentan como `missing`. Sin `update_existing` los
+    slugs existentes se dejan como están (`skipped`).
+    """
+    # Se comprueba contra la cabecera del fichero, antes de quedarse con las columnas usadas
+    lacking = [c for c in (('slug', 'price') if prices_only else REQUIRED) if c not in columns]
+    if lacking:
+        raise ValueError(f"Faltan columnas: {', '.join(lacking)}")
+    columns = ('slug', 'price') if prices_only else tuple(c for c in COLUMNS if c in columns)
+    stats = {'rows': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'missing': 0, 'skipped': 0, 'invalid': 0}
+    start = time.perf_counter()
+    batch = {}
+
+    def flush():
+        written = stats['inserted'] + stats['updated']
+        apply_batch(batch, columns, stats, prices_only, update_existing)
+        if stats['inserted'] + stats['updated'] > written:
+            # En la misma transacción que el lote: si un lote posterior falla, los ya
+            # confirmados invalidan igualmente la caché de catálogo de los workers
+            bump_catalog_version()  # los INSERT/UPDATE masivos no pasan por el before_flush
+        db.session.commit()
+        batch.clear()
+        if log:
+            log(f"{stats['rows']} filas ({stats['rows'] / (time.perf_counter() - start):.0f}/s)")
+
+    try:
+        for lineno, record in records:
+            stats['rows'] += 1
+            try:
+                row = clean_row(record, columns)
+            except ValueError as e:
+                stats['invalid'] += 1
+                if log and stats['invalid'] <= MAX_REPORTED_ERRORS:
+                    log(f'línea {lineno}: {e}')
+                continue
+            batch[row['slug']] = row  # slug repetido en el lote: gana el último
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    except Exception:
+        db.session.rollback()
+        raise
+    stats['seconds'] = round(time.perf_counter() - start, 3)
+    stats['rows_per_sec'] = round(stats['rows'] / stats['seconds']) if stats['seconds'] else stats['rows']
+    return stats
+
+
+def import_file(fh, fmt, batch_size=1000, prices_only=False, log=None):
+    records = read_records(fh, fmt)
+    first = next(records, None)
+    if first is None:
+        raise ValueError('Fichero vacío')
+    # Columnas: cabecera del CSV o claves del primer objeto JSONL
+    columns = first[1].keys() if isinstance(first[1], dict) else ()
+
+    def chained():
+        yield first
+        yield from records
+    return import_records(chained(), columns, batch_size, prices_only, log)
+
+
+def export_file(fh, fmt, batch_size=1000):
+    """Vuelca el catálogo en streaming (cursor de servidor en Postgres). Devuelve nº de filas."""
+    result = db.session.execute(
+        select(*(getattr(Product, c) for c in COLUMNS)).order_by(Product.id.asc())
+        .execution_options(yield_per=batch_size)
+    )
+    writer = csv.DictWriter(fh, fieldnames=COLUMNS) if fmt == 'csv' else None
+    if writer:
+        writer.writeheader()
+    n = 0
+    for row in result:
+        d = row._asdict()
+        if writer:
+            writer.writerow(d)
+        else:
+            d['price'] = str(d['price'])  # Decimal exacto, sin pasar por float
+            fh.write(json.dumps(d, ensure_ascii=False) + '\n')
+        n += 1
+    return n
@@ -0,0 +1,131 @@
+import base64, json
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import load_only
+from models import Product
+from catalog_cache import product_dict
+from images import product_images
+
+PRODUCT_FIELDS = ('id', 'name', 'slug', 'price', 'short_description', 'usage', 'warnings', 'image')
+SORTS = {
+    'id': (Product.id, False), '-id': (Product.id, True),
+    'price': (Product.price, False), '-price': (Product.price, True),
+    'name': (Product.name, False), '-name': (Product.name, True),
+}
+LIST_PARAMS = ('limit', 'cursor', 'sort', 'q', 'min_price', 'max_price')
+DEFAULT_LIMIT, MAX_LIMIT = 24, 100
+
+
+def parse_fields(raw):
+    """`fields=id,name,price` -> tupla de campos válidos (None = todos)."""
+    if not raw:
+        return None
+    fields = tuple(f.strip() for f in raw.split(',') if f.strip())
+    unknown = [f for f in fields if f not in PRODUCT_FIELDS]
+    if unknown:
+        raise ValueError(f"Campos desconocidos: {', '.join(unknown)}")
+    return fields
+
+
+def project(d, fields):
+    return d if not fields else {k: d[k] for k in fields}
+
+
+def _row_dict(p, fields):
+    if not fields:
+        return product_dict(p)
+    d = {k: getattr(p, k) for k in fields}  # price: Decimal exacto, como en product_dict
+    if 'image' in d:
+        d['image'] = product_images.versioned(p.image)
+    return d
+
+
+def encode_cursor(sort, value, last_id):
+    raw = json.dumps([sort, None if value is None else str(value), last_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        c_sort, value, last_id = json.loads(raw)
+        last_id = int(last_id)
+    except (ValueError, TypeError):
+        raise ValueError('cursor inválido')
+    if c_sort != sort:
+        raise ValueError('El cursor no corresponde a este orden')
+    if sort.lstrip('-') == 'price':
+        try:
+            value = Decimal(value)
+        except (InvalidOperation, TypeError):
+            raise ValueError('cursor inválido')
+        if not value.is_finite():
+            raise ValueError('cursor inválido')
+    elif sort.lstrip('-') == 'name' and not isinstance(value, str):
+        raise ValueError('cursor inválido')
+    return value, last_id
+
+
+def _price(args, key):
+    raw = args.get(key)
+    if raw in (None, ''):
+        return None
+    try:
+        value = Decimal(raw)
+    except InvalidOperation:
+        raise ValueError(f'{key} inválido')
+    if not value.is_finite():
+        raise ValueError(f'{key} inválido')
+    return value
+
+
+def wants_page(args):
+    return any(k in args for k in LIST_PARAMS)
+
+
+def product_page(args, fields=None):
+    """Listado paginado por keyset: (orden, id) > cursor. Devuelve (items, next_cursor)."""
+    sort = args.get('sort') or 'id'
+    if sort not in SORTS:
+        raise ValueError(f"sort debe ser uno de: {', '.join(SORTS)}")
+    try:
+        limit = min(max(int(args.get('limit') or DEFAULT_LIMIT), 1), MAX_LIMIT)
+    except ValueError:
+        raise ValueError('limit inválido')
+    col, desc = SORTS[sort]
+
+    query = Product.query
+    if fields:
+        # Solo se leen de BD las columnas pedidas (+ las del cursor)
+        cols = {*fields, 'id', col.key}
+        query = query.options(load_only(*(getattr(Product, c) for c in cols)))
+    min_price, max_price = _price(args, 'min_price'), _price(args, 'max_price')
+    if min_price is not None:
+        query = query.filter(Product.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Product.price <= max_price)
+    q = (args.get('q') or '').strip()
+    if q:
+        like = f'%{q}%'
+        query = query.filter(or_(Product.name.ilike(like), Product.short_description.ilike(like)))
+
+    if args.get('cursor'):
+        value, last_id = decode_cursor(args['cursor'], sort)
+        if col is Product.id:
+            query = query.filter(Product.id < last_id if desc else Product.id > last_id)
+        elif desc:
+            query = query.filter(or_(col < value, and_(col == value, Product.id < last_id)))
+        else:
+            query = query.filter(or_(col > value, and_(col == value, Product.id > last_id)))
+
+    order = [col.desc() if desc else col.asc()]
+    if col is not Product.id:
+        order.append(Product.id.desc() if desc else Product.id.asc())
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, getattr(last, col.key), last.id)
+    return [_row_dict(p, fields) for p in rows], next_cursor
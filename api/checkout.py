@@ -0,0 +1,72 @@
+from decimal import ROUND_HALF_UP, Decimal
+from models import db, CartItem, Product
+
+CURRENCY = 'chf'
+
+
+def to_minor(amount):
+    """Importe (Decimal, str o float de SQLite) -> céntimos exactos como int."""
+    return int((Decimal(str(amount)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def format_minor(minor):
+    """1780 -> '17.80' (sin pasar por float)."""
+    sign = '-' if minor < 0 else ''
+    return f'{sign}{abs(minor) // 100}.{abs(minor) % 100:02d}'
+
+
+def parse_guest_items(items_in, max_lines):
+    """Valida los items del carrito invitado y fusiona product_id repetidos -> {pid: qty}."""
+    if not isinstance(items_in, list) or not items_in:
+        raise ValueError('items requerido (lista de {product_id, qty})')
+    if len(items_in) > max_lines:
+        raise ValueError(f'Máximo {max_lines} líneas por carrito')
+    merged = {}
+    for it in items_in:
+        try:
+            pid = int(it.get('product_id'))
+            qty = int(it.get('qty') or 1)
+        except Exception:
+            raise ValueError('product_id/qty inválidos')
+        if qty < 1:
+            raise ValueError('qty debe ser >= 1')
+        merged[pid] = merged.get(pid, 0) + qty
+    return merged
+
+
+def products_by_id(product_ids):
+    """Resuelve todos los productos con una sola consulta IN."""
+    ids = list(product_ids)
+    if not ids:
+        return {}
+    return {p.id: p for p in Product.query.filter(Product.id.in_(ids))}
+
+
+def user_cart_lines(uid):
+    """[(product, qty)] del carrito del usuario en una sola consulta."""
+    items = (CartItem.query
+             .options(db.joinedload(CartItem.product))
+             .filter_by(user_id=uid)
+             .order_by(CartItem.id.asc())
+             .all())
+    return [(ci.product, ci.qty) for ci in items if ci.product]
+
+
+def build_line_items(lines, origin, currency=CURRENCY):
+    """Convierte [(product, qty)] en `line_items` de Stripe Checkout."""
+    line_items = []
+    for p, qty in lines:
+        price_cents = to_minor(p.price)
+        image_abs = f"{origin}{p.image}" if p.image and p.image.startswith('/api/') else None
+        li = {
+            "quantity": int(qty),
+            "price_data": {
+                "currency": currency,
+                "unit_amount": price_cents,
+                "product_data": { "name": p.name }
+            }
+        }
+        if image_abs:
+            li["price_data"]["product_data"]["images"] = [image_abs]
+        line_items.append(li)
+    return line_items
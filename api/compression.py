@@ -0,0 +1,111 @@
+import gzip, mimetypes, os
+from flask import request, send_from_directory
+
+try:
+    import brotli  # opcional: pip install brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+COMPRESSIBLE = {
+    'application/json', 'application/javascript', 'text/javascript', 'text/css',
+    'text/html', 'text/plain', 'image/svg+xml', 'application/manifest+json',
+}
+# Extensión del fichero precomprimido por codificación, en orden de preferencia
+SIBLINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def accepted_encodings(header):
+    """Codificaciones aceptadas por el cliente (ignora las marcadas con q=0)."""
+    accepted = set()
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if name and params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(name)
+    return accepted
+
+
+def _compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def init_compression(app, min_size=1024, level=6):
+    """Comprime al vuelo (br/gzip) las respuestas dinámicas de texto >= min_size bytes.
+
+    Si la vista deja en `response.compressed_variants` un dict {codificación: bytes}
+    (cuerpos precodificados de la caché de catálogo), se reutiliza y se rellena en
+    vez de comprimir el mismo cuerpo en cada petición.
+    """
+    dynamic = ('br', 'gzip') if brotli else ('gzip',)
+
+    @app.after_request
+    def _compress_response(response):
+        if (response.status_code != 200 or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE):
+            return response
+        response.vary.add('Accept-Encoding')
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding'))
+        encoding = next((e for e in dynamic if e in accepted), None)
+        if encoding is None or (response.content_length or 0) < min_size:
+            return response
+        variants = getattr(response, 'compressed_variants', None)
+        packed = variants.get(encoding) if variants is not None else None
+        if packed is None:
+            packed = _compress(response.get_data(), encoding, level)
+            if variants is not None:
+                variants[encoding] = packed
+        response.set_data(packed)
+        response.headers['Content-Encoding'] = encoding
+        # Otra representación: el ETag fuerte del cuerpo sin comprimir pasa a débil
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def send_precompressed(directory, filename, **kwargs):
+    """send_from_directory que sirve `x.br` / `x.gz` si existen y el cliente los acepta."""
+    accepted = accepted_encodings(request.headers.get('Accept-Encoding'))
+    mimetype = mimetypes.guess_type(filename)[0]
+    for encoding, ext in SIBLINGS:
+        if encoding in accepted and os.path.isfile(os.path.join(directory, filename + ext)):
+            response = send_from_directory(directory, filename + ext, mimetype=mimetype, **kwargs)
+            response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+            return response
+    response = send_from_directory(directory, filename, **kwargs)
+    if response.mimetype in COMPRESSIBLE:
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+def precompress_tree(root, min_size=1024, level=9):
+    """Genera hermanos .gz (y .br si hay brotli) de los ficheros comprimibles de `root`."""
+    written = 0
+    encodings = [('gzip', '.gz')] + ([('br', '.br')] if brotli else [])
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            if name.endswith(('.gz', '.br')) or mimetypes.guess_type(name)[0] not in COMPRESSIBLE:
+                continue
+            path = os.path.join(dirpath, name)
+            if os.path.getsize(path) < min_size:
+                continue
+            with open(path, 'rb') as fh:
+                data = fh.read()
+            for encoding, ext in encodings:
+                packed = _compress(data, encoding, 11 if encoding == 'br' else level)
+                if len(packed) < len(data):
+                    with open(path + ext, 'wb') as fh:
+                        fh.write(packed)
+                    written += 1
+    return written
+
+
+if __name__ == '__main__':
+    # Paso de build: python api/compression.py dist api/static
+    import sys
+    for root in sys.argv[1:] or ['dist']:
+        print(f'{root}: {precompress_tree(root)} ficheros precomprimidos')
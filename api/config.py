@@ -0,0 +1,117 @@
+import os
+from dataclasses import dataclass
+from sqlalchemy import event
+
+
+def _env(name, default, cast=str):
+    raw = os.getenv(name)
+    if raw in (None, ''):
+        return default
+    if cast is bool:
+        return raw.strip().lower() in ('1', 'true', 'yes', 'on')
+    return cast(raw)
+
+
+def _normalize_url(url):
+    return url.replace('postgres://', 'postgresql://', 1) if url.startswith('postgres://') else url
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Ajustes de BD y de gunicorn leídos del entorno (ver api/.env.example)."""
+    database_url: str = 'sqlite:///local.db'
+    # Réplica de lectura opcional (catálogo y GET /api/me)
+    read_replica_url: str = ''
+    replica_max_lag: float = 5.0           # s; por encima se lee del primario
+    replica_sticky_seconds: int = 5        # tras escribir, el usuario lee del primario
+    # Pool de SQLAlchemy (por proceso/worker)
+    db_pool_size: int = 5
+    db_max_overflow: int = 5
+    db_pool_timeout: float = 10
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int = 0       # 0 = sin límite
+    db_max_connections: int = 0            # límite del servidor Postgres (0 = no comprobar)
+    sqlite_wal: bool = True
+    # gunicorn
+    web_concurrency: int = 2
+    worker_class: str = 'sync'
+    threads: int = 4                       # >1: gthread (un hash o Stripe lento no para el worker)
+    worker_connections: int = 100
+    keepalive: int = 5
+    timeout: int = 30
+    max_requests: int = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            database_url=_normalize_url(_env('DATABASE_URL', cls.database_url)),
+            read_replica_url=_normalize_url(_env('READ_REPLICA_URL', cls.read_replica_url)),
+            replica_max_lag=_env('REPLICA_MAX_LAG', cls.replica_max_lag, float),
+            replica_sticky_seconds=_env('REPLICA_STICKY_SECONDS', cls.replica_sticky_seconds, int),
+            db_pool_size=_env('DB_POOL_SIZE', cls.db_pool_size, int),
+            db_max_overflow=_env('DB_MAX_OVERFLOW', cls.db_max_overflow, int),
+            db_pool_timeout=_env('DB_POOL_TIMEOUT', cls.db_pool_timeout, float),
+            db_pool_recycle=_env('DB_POOL_RECYCLE', cls.db_pool_recycle, int),
+            db_pool_pre_ping=_env('DB_POOL_PRE_PING', cls.db_pool_pre_ping, bool),
+            db_statement_timeout_ms=_env('DB_STATEMENT_TIMEOUT_MS', cls.db_statement_timeout_ms, int),
+            db_max_connections=_env('DB_MAX_CONNECTIONS', cls.db_max_connections, int),
+            sqlite_wal=_env('SQLITE_WAL', cls.sqlite_wal, bool),
+            web_concurrency=_env('WEB_CONCURRENCY', cls.web_concurrency, int),
+            worker_class=_env('GUNICORN_WORKER_CLASS', cls.worker_class),
+            threads=_env('GUNICORN_THREADS', cls.threads, int),
+            worker_connections=_env('GUNICORN_WORKER_CONNECTIONS', cls.worker_connections, int),
+            keepalive=_env('GUNICORN_KEEPALIVE', cls.keepalive, int),
+            timeout=_env('GUNICORN_TIMEOUT', cls.timeout, int),
+            max_requests=_env('GUNICORN_MAX_REQUESTS', cls.max_requests, int),
+        )
+
+    @property
+    def is_sqlite(self):
+        return self.database_url.startswith('sqlite')
+
+    def engine_options(self, url=None):
+        """SQLALCHEMY_ENGINE_OPTIONS para Flask-SQLAlchemy (de `url`, por defecto el primario)."""
+        url = url or self.database_url
+        if url.startswith('sqlite'):
+            return {'connect_args': {'timeout': 15}}
+        opts = {
+            'pool_size': self.db_pool_size,
+            'max_overflow': self.db_max_overflow,
+            'pool_timeout': self.db_pool_timeout,
+            'pool_recycle': self.db_pool_recycle,
+            'pool_pre_ping': self.db_pool_pre_ping,
+        }
+        if url.startswith('postgresql'):
+            # psycopg2: INSERT masivos en lotes con VALUES múltiples
+            opts['executemany_mode'] = 'values_plus_batch'
+            if self.db_statement_timeout_ms:
+                opts['connect_args'] = {'options': f'-c statement_timeout={self.db_statement_timeout_ms}'}
+        return opts
+
+    def binds(self):
+        """SQLALCHEMY_BINDS: el réplica como bind 'replica' (ningún modelo lo usa por defecto)."""
+        if not self.read_replica_url:
+            return {}
+        return {'replica': {'url': self.read_replica_url, **self.engine_options(self.read_replica_url)}}
+
+    def connections_per_process(self):
+        return self.db_pool_size + self.db_max_overflow
+
+    def max_app_connections(self):
+        return self.web_concurrency * self.connections_per_process()
+
+
+def install_sqlite_pragmas(engine, wal=True):
+    """WAL + synchronous=NORMAL en SQLite local: lecturas concurrentes con una escritura."""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        if wal:
+            cur.execute('PRAGMA journal_mode=WAL')
+            cur.execute('PRAGMA synchronous=NORMAL')
+        cur.execute('PRAGMA busy_timeout=15000')
+        cur.close()
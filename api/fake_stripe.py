@@ -0,0 +1,62 @@
+"""Servidor Stripe falso para pruebas de carga offline.
+
+Implementa solo POST /v1/checkout/sessions (con Idempotency-Key) y una
+latencia configurable. Uso:
+
+    python fake_stripe.py --port 12111 --latency 0.2
+    STRIPE_API_BASE=http://127.0.0.1:12111 STRIPE_SECRET_KEY=sk_test_fake python app.py
+"""
+import argparse, threading, time, uuid
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+
+def create_fake_stripe(latency=0.0):
+    app = Flask(__name__)
+    sessions, by_key, lock = {}, {}, threading.Lock()
+    app.config['STATS'] = stats = {'created': 0, 'replayed': 0}
+
+    @app.post('/v1/checkout/sessions')
+    def create_session():
+        if latency:
+            time.sleep(latency)
+        key = request.headers.get('Idempotency-Key')
+        params = sorted(request.form.items(multi=True))
+        with lock:
+            if key and key in by_key:
+                sid, seen = by_key[key]
+                if seen != params:
+                    # Como Stripe: misma clave con parámetros distintos es un error
+                    return jsonify(error={'type': 'idempotency_error', 'message': (
+                        'Keys for idempotent requests can only be used with the same parameters '
+                        'they were first used with.')}), 400
+                stats['replayed'] += 1
+                return jsonify(sessions[sid])
+            sid = f"cs_test_{uuid.uuid4().hex}"
+            sessions[sid] = {
+                'id': sid, 'object': 'checkout.session', 'mode': request.form.get('mode'),
+                'url': f"https://checkout.stripe.test/c/pay/{sid}",
+                'success_url': request.form.get('success_url'),
+                'cancel_url': request.form.get('cancel_url'),
+            }
+            if key:
+                by_key[key] = (sid, params)
+            stats['created'] += 1
+            return jsonify(sessions[sid])
+
+    return app
+
+
+def start_fake_stripe(port=0, latency=0.0):
+    """Arranca el servidor en un hilo. Devuelve (server, api_base); parar con server.shutdown()."""
+    server = make_server('127.0.0.1', port, create_fake_stripe(latency), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=12111)
+    parser.add_argument('--latency', type=float, default=0.0)
+    args = parser.parse_args()
+    create_fake_stripe(args.latency).run(host='127.0.0.1', port=args.port, threaded=True)
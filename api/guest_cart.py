@@ -0,0 +1,114 @@
+import json, secrets, time
+from itsdangerous import BadSignature, URLSafeSerializer
+from models import db
+from cart import apply_cart_ops, missing_products
+
+COOKIE_NAME = 'guest_cart'
+
+
+class GuestCarts:
+    """Carritos de invitado identificados por una cookie firmada.
+
+    Con `store` (MemoryStore / RedisStore) el navegador solo guarda un id aleatorio
+    firmado y las líneas {product_id: qty} viven en el almacén con caducidad
+    deslizante (cada escritura renueva el TTL). Con `store=None` las líneas viajan
+    firmadas en la propia cookie: es lo que se usa con varios workers y sin almacén
+    compartido, donde un MemoryStore por proceso partiría el carrito entre workers.
+    En ningún caso navegar como invitado escribe en la base de datos.
+    """
+
+    def __init__(self, store, secret, ttl=7 * 24 * 3600, max_lines=50, sweep_interval=60):
+        self.store = store
+        self.ttl = ttl
+        self.max_lines = max_lines
+        self.sweep_interval = sweep_interval
+        self._signer = URLSafeSerializer(secret, salt='guest-cart')
+        self._swept_at = 0.0
+
+    def new_id(self):
+        return secrets.token_urlsafe(16)
+
+    def sign(self, cart_id, lines=None):
+        """Valor de la cookie: el id o, sin almacén, [id, líneas]."""
+        if self.store is None:
+            return self._signer.dumps([cart_id, {str(pid): qty for pid, qty in (lines or {}).items()}])
+        return self._signer.dumps(cart_id)
+
+    def open(self, cookie):
+        """(id, líneas) de la cookie; (None, {}) si falta o está manipulada."""
+        if not cookie:
+            return None, {}
+        try:
+            value = self._signer.loads(cookie)
+        except BadSignature:
+            return None, {}
+        if self.store is None:
+            if not isinstance(value, list) or len(value) != 2:
+                return None, {}  # cookie de cuando había almacén: se empieza de cero
+            return value[0], _parse_lines(value[1])
+        if not isinstance(value, str):
+            return None, {}
+        return value, self.load(value)
+
+    def load(self, cart_id):
+        raw = self.store.get(f'cart:{cart_id}') if cart_id and self.store is not None else None
+        if not raw:
+            return {}
+        try:
+            return _parse_lines(json.loads(raw))
+        except ValueError:
+            return {}
+
+    def save(self, cart_id, lines):
+        if self.store is None:
+            return  # las líneas van en la cookie que devuelve sign()
+        self._maybe_sweep()
+        if lines:
+            self.store.set(f'cart:{cart_id}', json.dumps(lines), ttl=self.ttl)
+        else:
+            self.store.delete(f'cart:{cart_id}')
+
+    def delete(self, cart_id):
+        if cart_id and self.store is not None:
+            self.store.delete(f'cart:{cart_id}')
+
+    def _maybe_sweep(self):
+        # Purga de carritos caducados como mucho cada `sweep_interval` s (Redis lo hace solo)
+        now = time.monotonic()
+        if now - self._swept_at >= self.sweep_interval:
+            self._swept_at = now
+            self.store.sweep()
+
+
+def _parse_lines(raw):
+    try:
+        return {int(pid): int(qty) for pid, qty in raw.items()}
+    except (AttributeError, TypeError, ValueError):
+        return {}
+
+
+def apply_guest_ops(lines, ops, max_lines):
+    """Mismas operaciones que apply_cart_ops, sobre {product_id: qty}. Devuelve las líneas nuevas."""
+    lines = dict(lines)
+    for op, pid, qty in ops:
+        if op == 'remove' or (op == 'set' and qty < 1):
+            lines.pop(pid, None)
+        elif op == 'set':
+            lines[pid] = qty
+        else:
+            lines[pid] = lines.get(pid, 0) + qty
+    if len(lines) > max_lines:
+        raise ValueError(f'Máximo {max_lines} líneas por carrito')
+    return lines
+
+
+def merge_guest_cart(carts, cart_id, lines, uid):
+    """Al hacer login: suma las líneas del invitado al carrito del usuario y borra el de invitado."""
+    if not lines:
+        return 0
+    gone = set(missing_products(lines))
+    ops = [('add', pid, qty) for pid, qty in lines.items() if pid not in gone and qty > 0]
+    apply_cart_ops(uid, ops)
+    db.session.commit()
+    carts.delete(cart_id)
+    return len(ops)
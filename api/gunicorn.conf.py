@@ -0,0 +1,44 @@
+import glob, os, tempfile
+from config import Settings
+
+# gunicorn app:app -c gunicorn.conf.py  (todo se ajusta con variables de entorno)
+settings = Settings.from_env()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = settings.web_concurrency
+
+# Por defecto gthread (GUNICORN_THREADS=4): una llamada lenta a Stripe o un hash de
+# contraseña ocupan un hilo, no el worker entero. 'gevent' también sirve (`pip install
+# gevent`). Con sync y un hilo el pool de PasswordHasher no aporta nada.
+worker_class = settings.worker_class
+if worker_class == 'sync' and settings.threads > 1:
+    worker_class = 'gthread'
+threads = settings.threads
+worker_connections = settings.worker_connections
+keepalive = settings.keepalive
+timeout = settings.timeout
+max_requests = settings.max_requests
+max_requests_jitter = max_requests // 10
+
+# Métricas entre workers: cada uno escribe las suyas aquí y /api/metrics las suma.
+# Tiene que estar en el entorno antes de que los workers importen la app.
+if not os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='senda-metrics-')
+
+
+def on_starting(server):
+    # Sin restos de un arranque anterior (el directorio puede venir del entorno)
+    for path in glob.glob(os.path.join(os.environ['PROMETHEUS_MULTIPROC_DIR'], '*.db')):
+        os.remove(path)
+    # Cada worker abre hasta pool_size + max_overflow conexiones a Postgres
+    needed = settings.max_app_connections()
+    limit = settings.db_max_connections
+    if limit and not settings.is_sqlite and needed > limit:
+        server.log.warning(
+            "workers(%s) x (DB_POOL_SIZE + DB_MAX_OVERFLOW = %s) = %s conexiones > DB_MAX_CONNECTIONS=%s",
+            workers, settings.connections_per_process(), needed, limit)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
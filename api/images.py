@@ -0,0 +1,98 @@
+import hashlib, os, tempfile, threading
+
+try:
+    from PIL import Image  # opcional: pip install Pillow
+except ImportError:  # pragma: no cover - sin Pillow se sirve siempre el original
+    Image = None
+
+STATIC_URL = '/api/static/products/'
+WIDTHS = (160, 320, 640, 1024)
+FORMATS = {'webp': ('WEBP', 'image/webp'), 'jpeg': ('JPEG', 'image/jpeg')}
+
+
+class ProductImages:
+    """Imágenes de producto: URLs con hash de contenido y variantes redimensionadas.
+
+    Las variantes (ancho x formato) se generan una vez y se guardan en disco;
+    cuando la caché supera `max_bytes` se borran las menos usadas (LRU por mtime).
+    """
+
+    def __init__(self, root, cache_dir, max_bytes=200 * 1024 * 1024):
+        self.root = root
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hashes = None
+
+    def scan(self):
+        hashes = {}
+        if os.path.isdir(self.root):
+            for entry in os.scandir(self.root):
+                if entry.is_file() and not entry.name.endswith(('.gz', '.br')):
+                    with open(entry.path, 'rb') as fh:
+                        hashes[entry.name] = hashlib.sha256(fh.read()).hexdigest()[:12]
+        self._hashes = hashes
+
+    def content_hash(self, filename):
+        if self._hashes is None:
+            self.scan()
+        return self._hashes.get(filename)
+
+    def versioned(self, url):
+        """'/api/static/products/x.jpg' -> '/api/static/products/x.jpg?v=<hash>'."""
+        if not url or not url.startswith(STATIC_URL):
+            return url
+        digest = self.content_hash(url[len(STATIC_URL):])
+        return f'{url}?v={digest}' if digest else url
+
+    @property
+    def can_resize(self):
+        return Image is not None
+
+    def variant(self, filename, width, fmt):
+        """Ruta de la variante en disco (generándola si hace falta)."""
+        source = os.path.join(self.root, filename)
+        digest = self.content_hash(filename)
+        if not digest:
+            raise FileNotFoundError(filename)
+        name = f'{os.path.splitext(filename)[0]}-{digest}-{width or 0}.{fmt}'
+        path = os.path.join(self.cache_dir, name)
+        if os.path.exists(path):
+            os.utime(path)  # marca de uso para el LRU
+            return path
+        with self._lock:
+            if not os.path.exists(path):
+                self._render(source, path, width, fmt)
+                self._evict()
+        return path
+
+    def _render(self, source, path, width, fmt):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with Image.open(source) as img:
+            if width and img.width > width:
+                img = img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+            if img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as fh:
+                img.save(fh, FORMATS[fmt][0], quality=80, optimize=True)
+        os.replace(tmp, path)  # atómico: ningún worker ve un fichero a medias
+
+    def _evict(self):
+        entries = [e for e in os.scandir(self.cache_dir) if e.is_file() and not e.name.endswith('.tmp')]
+        total = sum(e.stat().st_size for e in entries)
+        for e in sorted(entries, key=lambda e: e.stat().st_mtime):
+            if total <= self.max_bytes:
+                break
+            total -= e.stat().st_size
+            try:
+                os.remove(e.path)
+            except FileNotFoundError:
+                pass
+
+
+product_images = ProductImages(
+    root=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'products'),
+    cache_dir=os.getenv('IMAGE_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'senda-image-cache'),
+    max_bytes=int(os.getenv('IMAGE_CACHE_MAX_MB', '200')) * 1024 * 1024,
+)
@@ -0,0 +1,145 @@
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, insert, select, update
+from models import db, Product, StockReservation
+
+
+REF_PREFIX = 32  # ref = hash del carrito[:32] + uuid4 (64 caracteres)
+
+
+class OutOfStock(Exception):
+    def __init__(self, product_id):
+        super().__init__(f'Sin stock suficiente para el producto {product_id}')
+        self.product_id = product_id
+
+
+def _change_stock(product_id, delta, *criteria):
+    # updated_at se deja igual: mover stock no es un cambio de catálogo
+    return db.session.execute(
+        update(Product)
+        .where(Product.id == product_id, Product.stock.isnot(None), *criteria)
+        .values(stock=Product.stock + delta, updated_at=Product.updated_at)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def _take(product_id, qty):
+    """UPDATE condicional: descuenta solo si hay unidades. El bloqueo de fila dura una
+    sentencia (sin SELECT ... FOR UPDATE ni colas de espera en el mismo SKU)."""
+    return _change_stock(product_id, -qty, Product.stock >= qty) == 1
+
+
+def _release(*criteria):
+    """'held' -> 'released' y devuelve las unidades. El WHERE status='held' garantiza que
+    dos procesos (barrido y webhook, p.ej.) no devuelvan la misma reserva dos veces."""
+    rows = db.session.execute(
+        update(StockReservation)
+        .where(StockReservation.status == 'held', *criteria)
+        .values(status='released')
+        .returning(StockReservation.product_id, StockReservation.qty)
+        .execution_options(synchronize_session=False)
+    ).all()
+    back = {}
+    for product_id, qty in rows:
+        back[product_id] = back.get(product_id, 0) + qty
+    if back:
+        # Un solo UPDATE (executemany de Core) sean cuantas sean las líneas; las de stock NULL no cambian
+        product = Product.__table__
+        db.session.connection().execute(
+            update(product)
+            .where(product.c.id == bindparam('pid'), product.c.stock.isnot(None))
+            .values(stock=product.c.stock + bindparam('qty'), updated_at=product.c.updated_at),
+            [{'pid': pid, 'qty': qty} for pid, qty in sorted(back.items())],
+        )
+    return len(rows)
+
+
+def reserve(key, wanted, ttl, owner=None):
+    """Aparta {product_id: qty} durante `ttl` segundos para el carrito `key` (su hash).
+
+    Devuelve (ref, caducidad, creada). `ref` es única por reserva: empieza por el hash
+    del carrito y termina en un uuid, así un carrito idéntico comprado otra vez estrena
+    ref y sesión de Stripe. Mientras la reserva del mismo `owner` y carrito siga viva
+    se devuelve esa (doble clic, reintento) con `creada` = False, y entonces no le
+    corresponde a quien llama liberarla. Si falta stock de algún producto, deshace
+    todo y lanza OutOfStock. Las reservas anteriores del mismo `owner` (carrito
+    cambiado antes de pagar) se liberan para no bloquear stock por duplicado.
+    Todas las líneas quedan anotadas; las de productos sin control de inventario
+    (stock NULL) no descuentan nada.
+    """
+    now = datetime.utcnow()
+    prefix = key[:REF_PREFIX]
+    owner = owner[:255] if owner else None
+    held = (StockReservation.query
+            .filter(StockReservation.owner == owner, StockReservation.ref.startswith(prefix),
+                    StockReservation.status == 'held', StockReservation.expires_at > now)
+            .first())
+    if held:
+        return held.ref, held.expires_at, False  # doble clic / reintento: ya está reservado
+
+    ref = prefix + uuid.uuid4().hex
+    expires_at = now + timedelta(seconds=ttl)
+    try:
+        if owner:
+            _release(StockReservation.owner == owner)
+        tracked = db.session.scalars(
+            select(Product.id).where(Product.id.in_(list(wanted)), Product.stock.isnot(None))
+        ).all()
+        # Orden fijo por id para que dos carritos no se bloqueen mutuamente
+        for pid in sorted(tracked):
+            if not _take(pid, wanted[pid]):
+                raise OutOfStock(pid)
+        db.session.execute(insert(StockReservation), [
+            dict(ref=ref, owner=owner, product_id=pid, qty=qty, status='held',
+                 expires_at=expires_at, created_at=now) for pid, qty in wanted.items()])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return ref, expires_at, True
+
+
+def release(ref):
+    """Devuelve al stock las reservas 'held' de `ref` (sesión cancelada/expirada o error)."""
+    released = _release(StockReservation.ref == ref)
+    db.session.commit()
+    return released
+
+
+def commit_reservations(ref, wanted):
+    """Pago confirmado: las reservas pasan a 'committed' (sin commit: va con el pedido).
+
+    Si la reserva ya no estaba (caducada, o liberada al abrir el mismo cliente otro
+    checkout cuya sesión vieja se pagó igual), el stock se descuenta ahora solo si
+    alcanza. Devuelve los productos que no alcanzaron: el pedido está cobrado pero
+    sobrevendido y hay que reponer o reembolsar.
+    """
+    covered = set()
+    if ref:
+        db.session.execute(
+            update(StockReservation)
+            .where(StockReservation.ref == ref, StockReservation.status == 'held')
+            .values(status='committed')
+            .execution_options(synchronize_session=False)
+        )
+        covered = set(db.session.scalars(
+            select(StockReservation.product_id)
+            .where(StockReservation.ref == ref, StockReservation.status == 'committed')
+        ))
+    late = {pid: qty for pid, qty in wanted.items() if pid not in covered}
+    if not late:
+        return []
+    tracked = db.session.scalars(
+        select(Product.id).where(Product.id.in_(list(late)), Product.stock.isnot(None))
+    ).all()
+    return [pid for pid in sorted(tracked) if not _take(pid, late[pid])]
+
+
+def sweep_expired(limit=500):
+    """Libera las reservas caducadas; devuelve cuántas."""
+    expired = (select(StockReservation.id)
+               .where(StockReservation.status == 'held', StockReservation.expires_at <= datetime.utcnow())
+               .limit(limit))
+    released = _release(StockReservation.id.in_(expired))
+    db.session.commit()
+    return released
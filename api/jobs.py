@@ -0,0 +1,105 @@
+import json, time, traceback
+from datetime import datetime, timedelta
+from sqlalchemy import or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, Job
+
+HANDLERS = {}
+MAX_ATTEMPTS = 8
+STALE_AFTER = timedelta(minutes=10)  # un job 'running' más viejo se da por huérfano
+
+_INSERT_DIALECTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def handler(kind):
+    """Registra la función que procesa los jobs de tipo `kind` (recibe el payload ya parseado)."""
+    def decorator(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+
+def enqueue(kind, payload, event_id=None):
+    """Encola un job (sin commit). Con `event_id` repetido no hace nada; devuelve si se encoló."""
+    if not isinstance(payload, str):
+        payload = json.dumps(payload)
+    insert = _INSERT_DIALECTS.get(db.engine.dialect.name)
+    if insert is None:
+        if event_id and Job.query.filter_by(event_id=event_id).first():
+            return False
+        db.session.add(Job(kind=kind, payload=payload, event_id=event_id))
+        return True
+    stmt = insert(Job).values(kind=kind, payload=payload, event_id=event_id,
+                              status='pending', attempts=0, run_at=datetime.utcnow(),
+                              created_at=datetime.utcnow())
+    return db.session.execute(stmt.on_conflict_do_nothing(index_elements=['event_id'])).rowcount == 1
+
+
+def claim_next():
+    """Reserva el siguiente job listo con un UPDATE condicional (vale en Postgres y SQLite)."""
+    now = datetime.utcnow()
+    ready = or_(
+        (Job.status == 'pending') & (Job.run_at <= now),
+        (Job.status == 'running') & (Job.locked_at < now - STALE_AFTER),
+    )
+    candidates = db.session.query(Job.id, Job.status).filter(ready).order_by(Job.run_at.asc()).limit(10).all()
+    for job_id, status in candidates:
+        res = db.session.execute(
+            update(Job).where(Job.id == job_id, Job.status == status)
+            .values(status='running', locked_at=now, attempts=Job.attempts + 1)
+        )
+        db.session.commit()
+        if res.rowcount == 1:  # otro worker no se lo llevó antes
+            return db.session.get(Job, job_id)
+    return None
+
+
+def run_job(job):
+    try:
+        fn = HANDLERS.get(job.kind)
+        if fn is None:
+            raise LookupError(f'Sin handler para {job.kind!r}')
+        fn(json.loads(job.payload))
+        job.status, job.last_error = 'done', None
+        db.session.commit()
+        return True
+    except Exception:
+        db.session.rollback()
+        job = db.session.get(Job, job.id)
+        job.last_error = traceback.format_exc(limit=5)
+        if job.attempts >= MAX_ATTEMPTS:
+            job.status = 'failed'
+        else:
+            # Reintento con backoff exponencial: 10s, 20s, 40s...
+            job.status = 'pending'
+            job.run_at = datetime.utcnow() + timedelta(seconds=10 * 2 ** (job.attempts - 1))
+        db.session.commit()
+        return False
+
+
+def work(once=False, max_jobs=None, idle_sleep=1.0, log=print, periodic=None, every=30.0):
+    """Bucle del worker. `once=True` procesa lo pendiente y termina.
+
+    `periodic` (opcional) se ejecuta como mucho cada `every` segundos, p.ej. el
+    barrido de reservas de stock caducadas.
+    """
+    done, last_periodic = 0, 0.0
+    while max_jobs is None or done < max_jobs:
+        if periodic and time.monotonic() - last_periodic >= every:
+            last_periodic = time.monotonic()
+            try:
+                periodic()
+            except Exception:
+                db.session.rollback()
+                log(traceback.format_exc(limit=3))
+        job = claim_next()
+        if job is None:
+            if once:
+                break
+            db.session.remove()
+            time.sleep(idle_sleep)
+            continue
+        ok = run_job(job)
+        log(f"job {job.id} ({job.kind}) {'ok' if ok else 'error'}")
+        done += 1
+    return done
@@ -0,0 +1,53 @@
+import decimal, json
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson  # opcional: pip install orjson
+except ImportError:  # pragma: no cover - sin orjson se usa json de la stdlib
+    orjson = None
+
+_Fragment = getattr(orjson, 'Fragment', None)  # orjson >= 3.9
+
+
+def _default(o):
+    # Decimal como número JSON (no como string, que es lo que hace Flask por defecto)
+    if isinstance(o, decimal.Decimal):
+        return _Fragment(str(o)) if _Fragment else float(o)
+    return DefaultJSONProvider.default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Proveedor JSON de Flask: orjson si está instalado, si no la stdlib.
+
+    Los Numeric de la BD se pueden devolver como Decimal tal cual; además
+    `response_bytes` permite responder con JSON ya codificado (caché).
+    """
+
+    def dumps_bytes(self, obj):
+        if orjson is not None:
+            opts = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if self.sort_keys else 0)
+            return orjson.dumps(obj, default=_default, option=opts)
+        return json.dumps(obj, default=_default, ensure_ascii=self.ensure_ascii,
+                          sort_keys=self.sort_keys, separators=(',', ':')).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs.get('indent'):
+            return self.dumps_bytes(obj).decode('utf-8')
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(obj)
+        return self.response_bytes(self.dumps_bytes(obj))
+
+    def response_bytes(self, body):
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,110 @@
+import threading, time
+from collections import OrderedDict
+
+
+class MemoryStore:
+    """Almacén clave-valor en proceso con TTL.
+
+    Implementa el mismo subconjunto de operaciones que `RedisStore`, así que sirve
+    de sustituto local del almacén compartido (tests, desarrollo, un solo nodo).
+    Con `max_keys` se comporta como una LRU: al llenarse descarta la clave menos usada.
+    """
+
+    def __init__(self, max_keys=None):
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (value, expira | None), de menos a más reciente
+        self.max_keys = max_keys
+
+    def _touch(self, key):
+        self._data.move_to_end(key)
+        if self.max_keys:
+            while len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+
+    def _alive(self, key, now):
+        item = self._data.get(key)
+        if item and item[1] is not None and item[1] <= now:
+            del self._data[key]
+            return None
+        return item
+
+    def get(self, key):
+        with self._lock:
+            item = self._alive(key, time.time())
+            if not item:
+                return None
+            self._touch(key)
+            return item[0]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+            self._touch(key)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key, ttl):
+        """Incrementa un contador; el TTL se fija al crearlo (como INCR + EXPIRE NX)."""
+        with self._lock:
+            now = time.time()
+            item = self._alive(key, now)
+            value, expires = (item[0] + 1, item[1]) if item else (1, now + ttl)
+            self._data[key] = (value, expires)
+            self._touch(key)
+            return value
+
+    def ttl(self, key):
+        with self._lock:
+            item = self._alive(key, time.time())
+            if not item:
+                return -2
+            return -1 if item[1] is None else max(0.0, item[1] - time.time())
+
+    def sweep(self):
+        """Elimina las claves caducadas; devuelve cuántas."""
+        with self._lock:
+            now = time.time()
+            dead = [k for k, (_, exp) in self._data.items() if exp is not None and exp <= now]
+            for k in dead:
+                del self._data[k]
+            return len(dead)
+
+
+class RedisStore:
+    """Adaptador a Redis (u otro servidor compatible) compartido entre workers/nodos."""
+
+    def __init__(self, url, prefix='senda:'):
+        import redis  # en requirements.txt; solo se importa si se configura un redis://
+        self._r = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        return self._r.get(self.prefix + key)
+
+    def set(self, key, value, ttl=None):
+        self._r.set(self.prefix + key, value, ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        self._r.delete(self.prefix + key)
+
+    def incr(self, key, ttl):
+        # SET NX EX crea el contador con su TTL e INCR lo conserva (EXPIRE NX exigiría Redis >= 7)
+        pipe = self._r.pipeline()
+        pipe.set(self.prefix + key, 0, ex=max(int(ttl), 1), nx=True)
+        pipe.incr(self.prefix + key)
+        return pipe.execute()[1]
+
+    def ttl(self, key):
+        return self._r.ttl(self.prefix + key)
+
+    def sweep(self):
+        return 0  # Redis caduca las claves por sí mismo
+
+
+def store_from_url(url, max_keys=None, prefix='senda:'):
+    """'memory://' (o vacío) -> MemoryStore; 'redis://...' -> RedisStore."""
+    if not url or url.startswith('memory:'):
+        return MemoryStore(max_keys=max_keys)
+    return RedisStore(url, prefix=prefix)
@@ -0,0 +1,116 @@
+import os, time
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from sqlalchemy import event
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metrics:
+    """Métricas Prometheus (prometheus_client).
+
+    Con PROMETHEUS_MULTIPROC_DIR (lo pone gunicorn.conf.py) cada worker escribe sus
+    valores en ese directorio y `render` suma los de todos: el scrape no depende del
+    worker que lo atienda y los contadores no retroceden al reciclar un worker.
+    Sin él, los valores son del proceso (flask run, tests).
+    """
+
+    def __init__(self, slow_query_ms=0):
+        self.slow_query_ms = slow_query_ms
+        self.registry = CollectorRegistry(auto_describe=True)
+        self.latency = Histogram('http_request_duration_seconds', 'Duración de las peticiones',
+                                 ('method', 'endpoint'), buckets=BUCKETS, registry=self.registry)
+        self.requests = Counter('http_requests', 'Peticiones por estado',
+                                ('method', 'endpoint', 'status'), registry=self.registry)
+        self.db_queries = Counter('db_queries', 'Sentencias SQL', ('endpoint',), registry=self.registry)
+        self.db_seconds = Counter('db_query_seconds', 'Tiempo en SQL', ('endpoint',), registry=self.registry)
+        self.external = Histogram('external_call_duration_seconds', 'Llamadas externas (Stripe...)',
+                                  ('service',), buckets=BUCKETS, registry=self.registry)
+
+    def observe_request(self, method, endpoint, status, seconds, queries, db_seconds):
+        self.latency.labels(method, endpoint).observe(seconds)
+        self.requests.labels(method, endpoint, str(status)).inc()
+        self.db_queries.labels(endpoint).inc(queries)
+        self.db_seconds.labels(endpoint).inc(db_seconds)
+
+    def observe_external(self, service, seconds):
+        self.external.labels(service).observe(seconds)
+
+    def render(self):
+        """Formato de exposición de texto de Prometheus (de todos los workers si los hay)."""
+        registry = self.registry
+        if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+
+
+@contextmanager
+def external_call(service):
+    """Mide una llamada externa (p.ej. Stripe): histograma + entrada en Server-Timing."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics = current_app.extensions.get('metrics') if has_request_context() else None
+        if metrics:
+            metrics.observe_external(service, elapsed)
+            timings = g.setdefault('_timings', {})
+            timings[service] = timings.get(service, 0.0) + elapsed
+
+
+def init_metrics(app, db, slow_query_ms=0, token=None):
+    metrics = Metrics(slow_query_ms=slow_query_ms)
+    app.extensions['metrics'] = metrics
+
+    # El inicio va en el contexto de ejecución de cada sentencia: si falla no queda nada colgado
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_start
+        if has_request_context() and hasattr(g, '_db_queries'):
+            g._db_queries += 1
+            g._db_seconds += elapsed
+        if metrics.slow_query_ms and elapsed * 1000 >= metrics.slow_query_ms:
+            app.logger.warning('Consulta lenta (%.1f ms): %s', elapsed * 1000, statement)
+
+    with app.app_context():
+        engines = list(db.engines.values())  # primario y, si lo hay, réplica
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', _before)
+        event.listen(engine, 'after_cursor_execute', _after)
+
+    @app.before_request
+    def _start_timer():
+        g._start = time.perf_counter()
+        g._db_queries, g._db_seconds, g._timings = 0, 0.0, {}
+
+    @app.after_request
+    def _record(response):
+        if not hasattr(g, '_start'):
+            return response
+        elapsed = time.perf_counter() - g._start
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe_request(request.method, endpoint, response.status_code,
+                                elapsed, g._db_queries, g._db_seconds)
+        timing = [f'app;dur={elapsed * 1000:.1f}',
+                  f'db;dur={g._db_seconds * 1000:.1f};desc="{g._db_queries} queries"']
+        timing += [f'{name};dur={s * 1000:.1f}' for name, s in g._timings.items()]
+        response.headers['Server-Timing'] = ', '.join(timing)
+        return response
+
+    if not token and not app.debug:
+        # Sin METRICS_TOKEN las métricas (rutas, volumen, tiempos) no se publican
+        app.logger.info('METRICS_TOKEN sin definir: /api/metrics desactivado')
+        return metrics
+
+    @app.get('/api/metrics')
+    def metrics_endpoint():
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return app.response_class(status=401)
+        return app.response_class(metrics.render(), content_type=CONTENT_TYPE_LATEST)
+
+    return metrics
@@ -0,0 +1,47 @@
+"""product search index
+
+Revision ID: 3aec4885fcf0
+Revises: f901ef6161c3
+Create Date: 2026-10-18 07:52:10.412310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3aec4885fcf0'
+down_revision = 'f901ef6161c3'
+branch_labels = None
+depends_on = None
+
+# Debe coincidir con search.SEARCH_VECTOR
+SEARCH_VECTOR = (
+    "(setweight(to_tsvector('es_unaccent', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('es_unaccent', coalesce(short_description, '')), 'B') || "
+    "setweight(to_tsvector('es_unaccent', coalesce(usage, '')), 'C'))"
+)
+
+
+def upgrade():
+    # Solo Postgres; en SQLite la búsqueda usa el índice en memoria de search.py
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute("""
+        DO $$ BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'es_unaccent') THEN
+                CREATE TEXT SEARCH CONFIGURATION es_unaccent (COPY = spanish);
+                ALTER TEXT SEARCH CONFIGURATION es_unaccent
+                    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+            END IF;
+        END $$
+    """)
+    op.execute(f"CREATE INDEX IF NOT EXISTS ix_product_search ON product USING GIN ({SEARCH_VECTOR})")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP INDEX IF EXISTS ix_product_search")
+    op.execute("DROP TEXT SEARCH CONFIGURATION IF EXISTS es_unaccent")
@@ -1,7 +1,8 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
+from replica import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -9,8 +10,15 @@ class User(db.Model):
     password_hash = db.Column(db.String(255), nullable=False)
     name = db.Column(db.String(120), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Se incrementa al cambiar la contraseña: invalida los JWT emitidos antes
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
 class Product(db.Model):
+    __table_args__ = (
+        # Keyset: ORDER BY <col>, id con filtros por rango de precio
+        db.Index('ix_product_price_id', 'price', 'id'),
+        db.Index('ix_product_name_id', 'name', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     slug = db.Column(db.String(140), unique=True, nullable=False)
@@ -20,10 +28,88 @@ class Product(db.Model):
     warnings = db.Column(db.Text, nullable=True)
     image = db.Column(db.String(255), nullable=True)  # ruta relativa: /api/static/products/xxx.jpg
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    stock = db.Column(db.Integer, nullable=True)  # null = sin control de inventario
 
 class CartItem(db.Model):
+    __table_args__ = (
+        db.Index('uq_cart_item_user_product', 'user_id', 'product_id', unique=True),
+        db.Index('ix_cart_item_product_id', 'product_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     qty = db.Column(db.Integer, default=1, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    product = db.relationship('Product', lazy='select')
+
+class CatalogVersion(db.Model):
+    # Fila única (id=1): se incrementa con cada cambio en `product`
+    __tablename__ = 'catalog_version'
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Order(db.Model):
+    __tablename__ = 'orders'  # "order" es palabra reservada en SQL
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True, index=True)  # null = invitado
+    stripe_session_id = db.Column(db.String(255), unique=True, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='paid')  # paid | oversold (cobrado sin stock)
+    email = db.Column(db.String(120), nullable=True)
+    currency = db.Column(db.String(3), nullable=False, default='chf')
+    amount_total = db.Column(db.Integer, nullable=False, default=0)  # céntimos
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    lines = db.relationship('OrderLine', backref='order', lazy='select', cascade='all, delete-orphan')
+
+class OrderLine(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=True)
+    name = db.Column(db.String(120), nullable=False)
+    unit_amount = db.Column(db.Integer, nullable=False)  # céntimos
+    qty = db.Column(db.Integer, nullable=False)
+
+class CheckoutLine(db.Model):
+    # Líneas tal como se cobran en Checkout (precio incluido), por `ref` de la sesión;
+    # el webhook crea el pedido desde aquí y no desde los metadata (máx. 500 caracteres)
+    __tablename__ = 'checkout_line'
+    id = db.Column(db.Integer, primary_key=True)
+    ref = db.Column(db.String(64), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=True)
+    name = db.Column(db.String(120), nullable=False)
+    unit_amount = db.Column(db.Integer, nullable=False)  # céntimos
+    qty = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class Job(db.Model):
+    # Cola de trabajos persistente (eventos de Stripe, etc.); la procesa `flask jobs-work`
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(60), nullable=False)
+    event_id = db.Column(db.String(255), unique=True, nullable=True)  # idempotencia
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending|running|done|failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class StockReservation(db.Model):
+    # Unidades apartadas durante el checkout; `ref` = hash del carrito + uuid, una por reserva
+    __table_args__ = (
+        db.Index('ix_stock_reservation_status_expires', 'status', 'expires_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    ref = db.Column(db.String(64), nullable=False, index=True)
+    owner = db.Column(db.String(255), nullable=True, index=True)  # user:<id> | guest:<id de la cookie>
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    qty = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='held')  # held|committed|released
+    expires_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import insert
+from jobs import handler
+from models import db, CartItem, CheckoutLine, Order, OrderLine
+from checkout import CURRENCY, products_by_id, to_minor
+from inventory import commit_reservations, release, sweep_expired
+
+PAID_EVENTS = ('checkout.session.completed', 'checkout.session.async_payment_succeeded')
+RELEASE_EVENTS = ('checkout.session.expired', 'checkout.session.async_payment_failed')
+# Los pagos diferidos (SEPA...) pueden confirmarse días después de cerrar la sesión
+CHECKOUT_LINES_RETENTION = timedelta(days=30)
+
+
+def save_checkout_lines(ref, charged):
+    """Guarda las líneas [(product_id, nombre, céntimos, qty)] que se van a cobrar en `ref`.
+
+    Una sola sentencia INSERT (executemany); `ref` es nueva por reserva, no hay duplicados.
+    """
+    db.session.execute(insert(CheckoutLine), [
+        dict(ref=ref, product_id=pid, name=name, unit_amount=unit_amount, qty=qty,
+             created_at=datetime.utcnow()) for pid, name, unit_amount, qty in charged])
+    db.session.commit()
+
+
+def purge_checkout_lines():
+    """Borra las líneas de checkout más antiguas que CHECKOUT_LINES_RETENTION."""
+    n = (CheckoutLine.query
+         .filter(CheckoutLine.created_at < datetime.utcnow() - CHECKOUT_LINES_RETENTION)
+         .delete(synchronize_session=False))
+    db.session.commit()
+    return n
+
+
+def housekeeping():
+    """Tarea periódica de `jobs-work`: reservas caducadas y líneas de checkout viejas."""
+    sweep_expired()
+    purge_checkout_lines()
+
+
+def parse_cart_metadata(raw):
+    # Sesiones creadas antes de checkout_line llevaban el carrito en metadata['cart']
+    wanted = {}
+    for part in (raw or '').split(','):
+        pid, _, qty = part.partition(':')
+        if pid.strip().isdigit() and qty.strip().isdigit():
+            wanted[int(pid)] = wanted.get(int(pid), 0) + int(qty)
+    return wanted
+
+
+@handler('stripe_event')
+def handle_stripe_event(event):
+    session = event['data']['object']
+    if event.get('type') in RELEASE_EVENTS:
+        ref = (session.get('metadata') or {}).get('reservation')
+        if ref:
+            release(ref)  # el stock apartado vuelve a estar disponible
+        return
+    if event.get('type') not in PAID_EVENTS:
+        return
+    if session.get('payment_status') not in ('paid', 'no_payment_required'):
+        return  # pago diferido: llegará async_payment_succeeded
+    create_order_from_session(session)
+
+
+def create_order_from_session(session):
+    """Crea el pedido (idempotente por id de sesión) y vacía esas líneas del carrito."""
+    if Order.query.filter_by(stripe_session_id=session['id']).first():
+        return None
+    meta = session.get('metadata') or {}
+    uid = int(meta['user_id']) if str(meta.get('user_id') or '').isdigit() else None
+    ref = meta.get('reservation')
+
+    order = Order(
+        user_id=uid, stripe_session_id=session['id'], status='paid',
+        email=(session.get('customer_details') or {}).get('email'),
+        currency=session.get('currency') or CURRENCY,
+        amount_total=session.get('amount_total') or 0,
+    )
+    wanted = {}
+    for line in order_lines(ref, meta.get('cart')):
+        order.lines.append(line)
+        if line.product_id:
+            wanted[line.product_id] = wanted.get(line.product_id, 0) + line.qty
+    db.session.add(order)
+    if uid and wanted:
+        (CartItem.query
+         .filter(CartItem.user_id == uid, CartItem.product_id.in_(list(wanted)))
+         .delete(synchronize_session=False))
+    short = commit_reservations(ref, wanted)
+    if short:
+        # Cobrado sin stock (reserva perdida): se marca para reponer o reembolsar a mano
+        order.status = 'oversold'
+        current_app.logger.warning('Pedido %s sobrevendido: sin stock de %s', session['id'], short)
+    db.session.commit()
+    return order
+
+
+def order_lines(ref, legacy_cart=None):
+    """OrderLines con el precio cobrado (checkout_line); si no hay, desde metadata['cart']."""
+    stored = CheckoutLine.query.filter_by(ref=ref).order_by(CheckoutLine.id).all() if ref else []
+    if stored:
+        return [OrderLine(product_id=l.product_id, name=l.name, unit_amount=l.unit_amount, qty=l.qty)
+                for l in stored]
+    wanted = parse_cart_metadata(legacy_cart)
+    products = products_by_id(wanted)
+    return [OrderLine(product_id=pid if pid in products else None,
+                      name=products[pid].name if pid in products else f'Producto {pid}',
+                      unit_amount=to_minor(products[pid].price) if pid in products else 0, qty=qty)
+            for pid, qty in wanted.items()]
@@ -0,0 +1,66 @@
+import os, threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashingBusy(Exception):
+    """Demasiados hashes en cola: mejor rechazar (503) que bloquear el worker."""
+
+
+class PasswordHasher:
+    """Hash/verificación de contraseñas en un pool acotado de hilos.
+
+    scrypt/pbkdf2 de hashlib liberan el GIL, así que los hilos corren en paralelo
+    y el número de hashes simultáneos (CPU) queda limitado a `workers`, con como
+    mucho `max_pending` peticiones esperando turno.
+
+    Solo sirve con workers que atienden varias peticiones a la vez (gthread, el
+    valor por defecto de gunicorn.conf.py, o gevent): mientras un hilo espera su
+    hash, los demás siguen. Con workers sync de un hilo el worker queda igual de
+    ocupado durante el hash y el límite nunca pasa de 1.
+    """
+
+    def __init__(self, method='scrypt', workers=2, max_pending=16, wait_timeout=5.0):
+        self.method = method
+        self.wait_timeout = wait_timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pwhash')
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        # Prefijo "metodo:param..." de los hashes actuales, para detectar los antiguos
+        self._prefix = generate_password_hash('', method).split('$', 1)[0]
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            method=os.getenv('PASSWORD_HASH_METHOD', 'scrypt'),
+            workers=int(os.getenv('PASSWORD_HASH_WORKERS', '2')),
+            max_pending=int(os.getenv('PASSWORD_HASH_MAX_PENDING', '16')),
+        )
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise HashingBusy()
+        try:
+            if _gevent_patched():
+                # Con workers gevent, los hilos "reales" están en el threadpool del hub
+                import gevent
+                return gevent.get_hub().threadpool.apply(fn, args)
+            return self._pool.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, stored_hash, password):
+        return self._run(check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        return stored_hash.split('$', 1)[0] != self._prefix
+
+
+def _gevent_patched():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
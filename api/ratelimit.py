@@ -0,0 +1,70 @@
+import math, threading, time
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_rate(rate):
+    """'5/minute' -> (5, 60)."""
+    count, _, period = rate.partition('/')
+    return int(count), PERIODS[period.strip().rstrip('s')]
+
+
+class TokenBucketBackend:
+    """Token bucket en memoria (un worker): ráfaga de `limit`, recarga limit/period por segundo."""
+
+    def __init__(self, max_keys=50000):
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> (tokens, último instante)
+        self.max_keys = max_keys
+
+    def hit(self, key, limit, period):
+        rate = limit / period
+        now = time.monotonic()
+        with self._lock:
+            if len(self._buckets) > self.max_keys:
+                self._sweep(now, rate, limit)
+            tokens, last = self._buckets.get(key, (limit, now))
+            tokens = min(limit, tokens + (now - last) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0
+            self._buckets[key] = (tokens, now)
+            return math.ceil((1 - tokens) / rate)
+
+    def _sweep(self, now, rate, limit):
+        # Un cubo ya lleno equivale a no tenerlo
+        self._buckets = {k: v for k, v in self._buckets.items() if v[0] + (now - v[1]) * rate < limit}
+
+
+class StoreBackend:
+    """Ventana fija sobre un almacén compartido (kvstore.RedisStore / MemoryStore).
+
+    Menos preciso que el token bucket, pero solo necesita INCR + EXPIRE y el límite
+    vale para todos los workers y nodos a la vez.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def hit(self, key, limit, period):
+        window = int(time.time() // period)
+        count = self.store.incr(f'rl:{key}:{window}', period)
+        if count <= limit:
+            return 0
+        return max(1, math.ceil((window + 1) * period - time.time()))
+
+
+class RateLimiter:
+    def __init__(self, backend, enabled=True):
+        self.backend = backend
+        self.enabled = enabled
+
+    def check(self, *rules):
+        """rules: (clave, 'N/periodo'). Devuelve segundos de espera (0 = permitido)."""
+        if not self.enabled:
+            return 0
+        wait = 0
+        for key, rate in rules:
+            limit, period = parse_rate(rate)
+            wait = max(wait, self.backend.hit(key, limit, period))
+        return wait
@@ -0,0 +1,114 @@
+import threading, time
+from flask import g, request
+from flask_jwt_extended import decode_token
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+
+REPLICA_BIND = 'replica'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Endpoints que pueden leer del réplica: catálogo y perfil (solo lectura)
+REPLICA_ENDPOINTS = ('list_products', 'get_product', 'search_products', 'me')
+
+PG_LAG_SQL = text(
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE coalesce(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END'
+)
+VERSION_SQL = text('SELECT version FROM catalog_version WHERE id = 1')
+
+
+class RoutingSession(Session):
+    """Sesión que manda las lecturas al réplica si la petición lo ha pedido.
+
+    `session.info['replica']` lo pone ReplicaRouter en before_request. La primera
+    escritura (flush o INSERT/UPDATE/DELETE) lo retira: desde ahí todo va al primario,
+    así nada lee del réplica algo que acaba de escribirse.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get(REPLICA_BIND)
+        if replica is not None and bind is None:
+            if self._flushing or getattr(clause, 'is_dml', False):
+                self.info.pop(REPLICA_BIND, None)
+            else:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """Decide por petición si las lecturas van al réplica (bind 'replica').
+
+    - Solo GET/HEAD de `endpoints`; escrituras, carrito y checkout siempre al primario.
+    - Lee-lo-que-escribes: tras una escritura con JWT, ese usuario lee del primario
+      durante `sticky_seconds` (marca en `pins`: redis:// para compartirla entre workers).
+    - Si el réplica va más de `max_lag` s por detrás, su versión de catálogo es
+      anterior a la del primario o no responde, se lee del primario. Se comprueba
+      como mucho cada `check_interval` s.
+    """
+
+    def __init__(self, db, pins, max_lag=5.0, check_interval=2.0, sticky_seconds=5):
+        self.db = db
+        self.pins = pins
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.sticky_seconds = sticky_seconds
+        self._lock = threading.Lock()
+        self._healthy = False
+        self._checked_at = float('-inf')
+
+    def init_app(self, app, endpoints=REPLICA_ENDPOINTS):
+        endpoints = set(endpoints)
+        app.extensions['replica_router'] = self
+
+        @app.before_request
+        def _route_reads():
+            if request.method not in SAFE_METHODS or request.endpoint not in endpoints:
+                return
+            uid = _token_uid()
+            if (uid and self.pins.get(f'pin:{uid}')) or not self.healthy():
+                return
+            self.db.session.info[REPLICA_BIND] = self.db.engines[REPLICA_BIND]
+
+        @app.after_request
+        def _pin_writer(response):
+            self.db.session.info.pop(REPLICA_BIND, None)
+            if request.method not in SAFE_METHODS and response.status_code < 400:
+                uid = _token_uid()
+                if uid:
+                    self.pins.set(f'pin:{uid}', '1', ttl=self.sticky_seconds)
+            return response
+
+    def healthy(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._healthy
+        with self._lock:
+            if now - self._checked_at >= self.check_interval:
+                self._healthy = self._check()
+                self._checked_at = now
+        return self._healthy
+
+    def _check(self):
+        try:
+            with self.db.engines[REPLICA_BIND].connect() as conn:
+                if conn.dialect.name == 'postgresql' and float(conn.execute(PG_LAG_SQL).scalar()) > self.max_lag:
+                    return False
+                replica_version = conn.execute(VERSION_SQL).scalar() or 0
+            with self.db.engine.connect() as conn:
+                primary_version = conn.execute(VERSION_SQL).scalar() or 0
+        except Exception:
+            return False  # réplica caído o sin migrar: primario
+        return replica_version >= primary_version
+
+
+def _token_uid():
+    """uid del Bearer de la petición (sin comprobar revocación) o None."""
+    if '_replica_uid' not in g:
+        auth = request.headers.get('Authorization', '')
+        uid = None
+        if auth.startswith('Bearer '):
+            try:
+                uid = decode_token(auth[7:], allow_expired=True)['sub']
+            except Exception:
+                pass
+        g._replica_uid = uid
+    return g._replica_uid
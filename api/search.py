@@ -0,0 +1,131 @@
+import re, threading, unicodedata
+from bisect import bisect_left
+from sqlalchemy import func, literal_column
+from models import db, Product
+
+MAX_TERMS = 8
+DEFAULT_LIMIT, MAX_LIMIT = 20, 50
+
+# Misma expresión que el índice GIN ix_product_search (Postgres solo usa el índice
+# si la consulta repite la expresión tal cual, sin parámetros)
+TS_CONFIG = 'es_unaccent'
+SEARCH_VECTOR = (
+    f"(setweight(to_tsvector('{TS_CONFIG}', coalesce(name, '')), 'A') || "
+    f"setweight(to_tsvector('{TS_CONFIG}', coalesce(short_description, '')), 'B') || "
+    f"setweight(to_tsvector('{TS_CONFIG}', coalesce(usage, '')), 'C'))"
+)
+
+# Pesos de ts_rank por defecto para A/B/C: el nombre pesa más que la descripción
+FIELD_WEIGHTS = (('name', 1.0), ('short_description', 0.4), ('usage', 0.2))
+
+
+def normalize(s):
+    """Minúsculas y sin tildes: 'Carbón' -> 'carbon'."""
+    s = unicodedata.normalize('NFKD', (s or '').lower())
+    return ''.join(c for c in s if not unicodedata.combining(c))
+
+
+def stem(token):
+    """Stemming ligero en español (plurales y vocal final), suficiente para el fallback."""
+    if len(token) > 4 and token.endswith('es') and token[-3] in 'rlndzj':
+        token = token[:-2]
+    elif len(token) > 3 and token.endswith('s'):
+        token = token[:-1]
+    if len(token) > 4 and token[-1] in 'aoe':
+        token = token[:-1]
+    return token
+
+
+def tokenize(s):
+    return re.findall(r'[a-z0-9]+', normalize(s))
+
+
+def query_terms(q):
+    """Términos de búsqueda normalizados, sin repetidos y con un máximo de MAX_TERMS."""
+    return list(dict.fromkeys(tokenize(q)))[:MAX_TERMS]
+
+
+def parse_limit(raw):
+    try:
+        return min(max(int(raw or DEFAULT_LIMIT), 1), MAX_LIMIT)
+    except ValueError:
+        raise ValueError('limit inválido')
+
+
+def postgres_search(terms, limit):
+    """ids ordenados por relevancia usando el índice GIN (cada término como prefijo)."""
+    tsquery = func.to_tsquery(literal_column(f"'{TS_CONFIG}'"), ' & '.join(f'{t}:*' for t in terms))
+    vector = literal_column(SEARCH_VECTOR)
+    rank = func.ts_rank_cd(vector, tsquery)
+    rows = (db.session.query(Product.id)
+            .filter(vector.op('@@')(tsquery))
+            .order_by(rank.desc(), Product.id.asc())
+            .limit(limit).all())
+    return [pid for pid, in rows]
+
+
+class SearchIndex:
+    """Índice invertido en memoria sobre el catálogo (fallback sin Postgres).
+
+    Se reconstruye cuando cambia la versión del catálogo. Cada término de la
+    consulta casa por prefijo contra el vocabulario ordenado (bisect), así que
+    "carb" encuentra "Carbón Activo" mientras se escribe; una coincidencia
+    completa puntúa el doble que un prefijo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = object()
+        self._postings = {}  # token -> {id: peso}
+        self._vocab = []
+
+    def build(self, products, version=None):
+        postings = {}
+        for p in products:
+            for field, weight in FIELD_WEIGHTS:
+                for token in tokenize(p.get(field)):
+                    for key in {token, stem(token)}:
+                        docs = postings.setdefault(key, {})
+                        docs[p['id']] = docs.get(p['id'], 0.0) + weight
+        with self._lock:
+            self._postings, self._vocab = postings, sorted(postings)
+            self._version = version
+
+    def ensure(self, products, version):
+        if version != self._version:
+            self.build(products, version)
+
+    def _matches(self, term):
+        """{id: puntuación} de los tokens que empiezan por `term` (o su raíz)."""
+        scores = {}
+        for prefix in {term, stem(term)}:
+            i = bisect_left(self._vocab, prefix)
+            while i < len(self._vocab) and self._vocab[i].startswith(prefix):
+                token = self._vocab[i]
+                boost = 1.0 if token in (term, stem(term)) else 0.5
+                for pid, w in self._postings[token].items():
+                    scores[pid] = max(scores.get(pid, 0.0), w * boost)
+                i += 1
+        return scores
+
+    def search(self, terms, limit):
+        total = None
+        for term in terms:
+            matches = self._matches(term)
+            if total is None:
+                total = matches
+            else:  # todos los términos deben aparecer (AND, como en tsquery)
+                total = {pid: s + matches[pid] for pid, s in total.items() if pid in matches}
+            if not total:
+                return []
+        ranked = sorted(total.items(), key=lambda kv: (-kv[1], kv[0]))
+        return [pid for pid, _ in ranked[:limit]]
+
+
+def uses_postgres():
+    return db.engine.dialect.name == 'postgresql'
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """Alembic: el índice de búsqueda es una expresión creada a mano, no del modelo."""
+    return not (type_ == 'index' and name == 'ix_product_search')
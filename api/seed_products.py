@@ -1,5 +1,9 @@
+import argparse, os, random
+from werkzeug.security import generate_password_hash
 from app import app
-from models import db, Product
+from models import db, CartItem, Product, User
+from catalog_io import COLUMNS, import_records
+from bulk import insert_batches
 
 PRODUCTS = [
     {
@@ -60,13 +64,70 @@ PRODUCTS = [
     }
 ]
 
+
+def synthetic_products(n, rng):
+    """`n` productos variados a partir de PRODUCTS (nombre/slug únicos, precios distintos)."""
+    for i in range(1, n + 1):
+        base = PRODUCTS[i % len(PRODUCTS)]
+        extra = PRODUCTS[rng.randrange(len(PRODUCTS))]
+        yield {
+            **base,
+            'name': f"{base['name']} {extra['name'].split()[0]} {i}",
+            'slug': f"{base['slug']}-{i}",
+            'price': round(rng.uniform(4, 30), 2),
+            'short_description': f"{base['short_description']} {extra['short_description']}",
+        }
+
+
+def seed_products(products, batch=1000, overwrite=False):
+    """Inserta los slugs que falten (idempotente). Los existentes no se tocan: nombres y
+    precios cambiados en producción se respetan. Con `overwrite`, upsert desde `products`."""
+    columns = [c for c in COLUMNS if c != 'stock']  # el stock real no se pisa al sembrar
+    return import_records(enumerate(products, 1), columns, batch_size=batch, update_existing=overwrite)
+
+
+def seed_synthetic(products=0, users=0, cart_lines=0, password='secret123', seed=42, batch=1000):
+    """Dataset sintético para benchmarks: usuarios benchN@example.com con la misma contraseña."""
+    rng = random.Random(seed)
+    seed_products(synthetic_products(products, rng), batch)
+    # Un único hash compartido: hashear decenas de miles de contraseñas tardaría minutos
+    pw_hash = generate_password_hash(password, os.getenv('PASSWORD_HASH_METHOD', 'scrypt'))
+    insert_batches(db.session, User, ({'email': f'bench{i}@example.com', 'password_hash': pw_hash,
+                                       'name': f'Bench {i}'} for i in range(1, users + 1)), batch)
+    db.session.commit()
+
+    product_ids = [pid for pid, in db.session.query(Product.id)]
+    user_ids = [uid for uid, in db.session.query(User.id).filter(User.email.like('bench%@example.com'))]
+    if cart_lines and user_ids and product_ids:
+        per_user = min(max(cart_lines // len(user_ids), 1), len(product_ids))
+
+        def lines():
+            left = cart_lines
+            for uid in user_ids:
+                if left <= 0:
+                    return
+                for pid in rng.sample(product_ids, min(per_user, left)):
+                    yield {'user_id': uid, 'product_id': pid, 'qty': rng.randint(1, 3)}
+                left -= per_user
+        insert_batches(db.session, CartItem, lines(), batch)
+    db.session.commit()
+
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=0, help='productos sintéticos extra')
+    parser.add_argument('--users', type=int, default=0, help='usuarios benchN@example.com')
+    parser.add_argument('--cart-lines', type=int, default=0)
+    parser.add_argument('--password', default='secret123')
+    parser.add_argument('--overwrite', action='store_true',
+                        help='reescribe nombre, precio, etc. de los productos iniciales que ya existan')
+    args = parser.parse_args()
     with app.app_context():
         db.create_all()
-        if Product.query.count() == 0:
-            for p in PRODUCTS:
-                db.session.add(Product(**p))
-            db.session.commit()
-            print('Productos iniciales creados ✅')
-        else:
-            print('Ya existen productos, no se insertó nada.')
+        stats = seed_products(PRODUCTS, overwrite=args.overwrite)
+        print(f"Productos iniciales: {stats['inserted']} nuevos, {stats['updated']} actualizados, "
+              f"{stats['unchanged'] + stats['skipped']} sin cambios ✅")
+        if args.products or args.users or args.cart_lines:
+            seed_synthetic(args.products, args.users, args.cart_lines, args.password)
+            print(f'Datos sintéticos: {args.products} productos, {args.users} usuarios, '
+                  f'{args.cart_lines} líneas de carrito ✅')
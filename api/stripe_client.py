@@ -0,0 +1,74 @@
+import hashlib, json, os, threading, time
+import requests
+import stripe
+from requests.adapters import HTTPAdapter
+from metrics import external_call
+
+STRIPE_MIN_EXPIRY = 31 * 60  # Stripe exige expires_at >= 30 min desde la creación
+
+
+def configure_stripe():
+    """Cliente HTTP reutilizado (keep-alive + pool) y timeouts para todas las llamadas a Stripe."""
+    stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
+    if os.getenv('STRIPE_API_BASE'):
+        # p.ej. http://127.0.0.1:12111 para fake_stripe.py
+        stripe.api_base = os.getenv('STRIPE_API_BASE')
+    stripe.max_network_retries = int(os.getenv('STRIPE_MAX_RETRIES', '2'))
+
+    session = requests.Session()
+    pool = int(os.getenv('STRIPE_POOL_SIZE', '10'))
+    session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool))
+    session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=pool))
+    timeout = (float(os.getenv('STRIPE_CONNECT_TIMEOUT', '3')), float(os.getenv('STRIPE_TIMEOUT', '10')))
+    stripe.default_http_client = stripe.RequestsClient(timeout=timeout, session=session)
+
+
+def cart_hash(owner, line_items, success_url, cancel_url):
+    raw = json.dumps([owner, line_items, success_url, cancel_url], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class CheckoutSessions:
+    """Crea sesiones de Stripe Checkout de forma idempotente por reserva.
+
+    Los reintentos de la misma reserva (`ref`, única por reserva) dentro de `ttl`
+    segundos reciben la misma URL: primero desde la caché local y, si otro worker
+    la creó, gracias a la idempotency key que Stripe deduplica. Una reserva nueva
+    (carrito pagado y vuelto a comprar, reserva caducada) estrena ref, clave y sesión.
+    """
+
+    def __init__(self, ttl=600):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._urls = {}  # ref -> (url, expira)
+
+    def create(self, ref, line_items, success_url, cancel_url, metadata=None, expires_at=None):
+        now = time.time()
+        with self._lock:
+            hit = self._urls.get(ref)
+            if hit and hit[1] > now:
+                return hit[0]
+
+        extra = {}
+        if expires_at:
+            # La caducidad de la reserva, fija por reserva: un reintento manda los mismos
+            # parámetros con la misma clave (Stripe rechaza misma clave + parámetros distintos)
+            extra['expires_at'] = int(expires_at)
+        with external_call('stripe'):
+            session = stripe.checkout.Session.create(
+                mode="payment",
+                line_items=line_items,
+                success_url=success_url,
+                cancel_url=cancel_url,
+                allow_promotion_codes=True,
+                billing_address_collection="auto",
+                metadata=metadata or {},
+                idempotency_key=f"checkout-{ref}",
+                **extra,
+            )
+        # Nunca más allá de la sesión: una URL caducada no se reparte
+        until = min(now + self.ttl, expires_at) if expires_at else now + self.ttl
+        with self._lock:
+            self._urls = {k: v for k, v in self._urls.items() if v[1] > now}
+            self._urls[ref] = (session.url, until)
+        return session.url
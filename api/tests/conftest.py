@@ -0,0 +1,60 @@
+import logging, os, sys, tempfile
+import pytest
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+# Antes de importar app: el `app` de módulo no debe tocar instance/local.db
+os.environ.update({
+    'DATABASE_URL': 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'import.db'),
+    'RATELIMIT_ENABLED': '0', 'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+    'USER_CACHE_TTL': '0', 'CATALOG_VERSION_CHECK': '0', 'JWT_SECRET_KEY': 'test-secret-' + 'x' * 32,
+})
+
+from app import create_app  # noqa: E402
+from models import db, Product  # noqa: E402
+from seed_products import PRODUCTS  # noqa: E402
+from fake_stripe import start_fake_stripe  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def fake_stripe():
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # sin una línea por llamada a Stripe
+    server, base = start_fake_stripe()
+    yield server, base
+    server.shutdown()
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch, fake_stripe):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setenv('STRIPE_API_BASE', fake_stripe[1])
+    monkeypatch.setenv('STRIPE_SECRET_KEY', 'sk_test_fake')
+    monkeypatch.setenv('STRIPE_MAX_RETRIES', '0')
+    app = create_app()
+    with app.app_context():
+        db.create_all(bind_key=None)  # solo el primario (el réplica es una copia)
+        db.session.add_all(Product(**p) for p in PRODUCTS)
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth(client):
+    client.post('/api/auth/register', json={'email': 'ana@example.com', 'password': 'secret1', 'name': 'Ana'})
+    r = client.post('/api/auth/login', json={'email': 'ana@example.com', 'password': 'secret1'})
+    return {'Authorization': f"Bearer {r.get_json()['access_token']}"}
+
+
+@pytest.fixture
+def products(app):
+    with app.app_context():
+        return [p for p, in db.session.query(Product.id).order_by(Product.id)]
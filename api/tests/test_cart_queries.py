@@ -0,0 +1,65 @@
+import random
+from contextlib import contextmanager
+from sqlalchemy import event
+from models import db, CartItem, Product, User
+from seed_products import synthetic_products
+
+
+@contextmanager
+def count_queries(app):
+    statements = []
+    with app.app_context():
+        engine = db.engine
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+
+def fill_cart(app, lines):
+    with app.app_context():
+        missing = lines - db.session.query(Product).count()
+        db.session.add_all(Product(**p) for p in synthetic_products(max(missing, 0), random.Random(1)))
+        db.session.flush()
+        uid = db.session.query(User.id).filter_by(email='ana@example.com').scalar()
+        pids = [p for p, in db.session.query(Product.id).order_by(Product.id).limit(lines)]
+        CartItem.query.filter_by(user_id=uid).delete()
+        db.session.add_all(CartItem(user_id=uid, product_id=pid, qty=2) for pid in pids)
+        db.session.commit()
+
+
+def cart_queries(app, client, auth, lines):
+    fill_cart(app, lines)
+    with count_queries(app) as statements:
+        r = client.get('/api/cart', headers=auth)
+    assert r.status_code == 200
+    assert len(r.get_json()['items']) == lines
+    return len(statements)
+
+
+def test_cart_read_is_constant_in_cart_size(app, client, auth):
+    assert cart_queries(app, client, auth, 1) == cart_queries(app, client, auth, 30)
+
+
+def test_cart_read_does_not_write(app, client, auth):
+    fill_cart(app, 5)
+    with count_queries(app) as statements:
+        client.get('/api/cart', headers=auth)
+    assert not [s for s in statements if s.lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE'))]
+
+
+def checkout_statements(app, client, auth, lines):
+    fill_cart(app, lines)
+    with count_queries(app) as statements:
+        r = client.post('/api/checkout/session', json={}, headers=auth)
+    assert r.status_code == 200, r.get_json()
+    return statements
+
+
+def test_checkout_is_constant_in_cart_size(app, client, auth):
+    checkout_statements(app, client, auth, 2)  # así las dos medidas liberan una reserva anterior
+    one, thirty = checkout_statements(app, client, auth, 1), checkout_statements(app, client, auth, 30)
+    assert len(one) == len(thirty)
+    assert len([s for s in thirty if 'INSERT INTO checkout_line' in s]) == 1
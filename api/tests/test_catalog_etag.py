@@ -0,0 +1,48 @@
+from models import db, Product
+
+
+def test_list_etag_and_304(client):
+    r = client.get('/api/products')
+    assert r.status_code == 200
+    assert r.headers['ETag'] and r.headers['Last-Modified']
+    assert 'max-age' in r.headers['Cache-Control']
+    again = client.get('/api/products', headers={'If-None-Match': r.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == r.headers['ETag']
+
+
+def test_detail_etag_and_304(client):
+    r = client.get('/api/products/menta-alpina')
+    assert r.status_code == 200
+    assert r.get_json()['slug'] == 'menta-alpina'
+    assert client.get('/api/products/menta-alpina', headers={'If-None-Match': r.headers['ETag']}).status_code == 304
+    other = client.get('/api/products/rosa-mosqueta', headers={'If-None-Match': r.headers['ETag']})
+    assert other.status_code == 200
+
+
+def test_changed_product_gets_new_etag(app, client):
+    list_etag = client.get('/api/products').headers['ETag']
+    detail_etag = client.get('/api/products/menta-alpina').headers['ETag']
+    with app.app_context():
+        Product.query.filter_by(slug='menta-alpina').one().price = 12.40
+        db.session.commit()
+    r = client.get('/api/products', headers={'If-None-Match': list_etag})
+    assert r.status_code == 200 and r.headers['ETag'] != list_etag
+    d = client.get('/api/products/menta-alpina', headers={'If-None-Match': detail_etag})
+    assert d.status_code == 200 and d.headers['ETag'] != detail_etag
+    assert str(d.get_json()['price']) == '12.4'
+
+
+def test_fields_projection_has_own_etag(client):
+    full = client.get('/api/products')
+    r = client.get('/api/products?fields=id,name')
+    assert r.status_code == 200
+    assert all(set(p) == {'id', 'name'} for p in r.get_json())
+    assert r.headers['ETag'] != full.headers['ETag']
+    assert client.get('/api/products?fields=id,name', headers={'If-None-Match': r.headers['ETag']}).status_code == 304
+    d = client.get('/api/products/menta-alpina?fields=price')
+    assert d.get_json().keys() == {'price'}
+    assert client.get('/api/products/menta-alpina?fields=price',
+                      headers={'If-None-Match': d.headers['ETag']}).status_code == 304
+    assert client.get('/api/products?fields=nope').status_code == 400
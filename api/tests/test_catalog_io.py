@@ -0,0 +1,72 @@
+import io, json
+from decimal import Decimal
+import pytest
+import catalog_io
+from catalog_cache import read_catalog_version
+from catalog_io import export_file, import_file
+from models import db, Product
+from seed_products import PRODUCTS, seed_products
+
+
+def run_import(app, text, **kwargs):
+    with app.app_context():
+        return import_file(io.StringIO(text), 'csv', **kwargs)
+
+
+def test_import_upserts_and_skips_unchanged(app):
+    csv = 'slug,name,price\nmenta-alpina,Menta Alpina,8.90\nnuevo,Nuevo,3.50\n'
+    stats = run_import(app, csv)
+    assert (stats['inserted'], stats['updated'], stats['unchanged']) == (1, 0, 1)
+    assert run_import(app, csv)['unchanged'] == 2
+
+
+def test_prices_only_updates_existing_slugs(app):
+    stats = run_import(app, 'slug,price\nmenta-alpina,9.10\nno-existe,1.00\n', prices_only=True)
+    assert (stats['updated'], stats['missing']) == (1, 1)
+    with app.app_context():
+        assert str(Product.query.filter_by(slug='menta-alpina').one().price) == '9.10'
+
+
+@pytest.mark.parametrize('header', ['slug,name', 'name,price'])
+def test_prices_only_reports_missing_header_columns(app, header):
+    with pytest.raises(ValueError, match='Faltan columnas'):
+        run_import(app, f'{header}\nmenta-alpina,x\n', prices_only=True)
+
+
+def test_seed_keeps_live_edits(app):
+    with app.app_context():
+        Product.query.filter_by(slug='menta-alpina').one().price = Decimal('12.00')
+        db.session.commit()
+        stats = seed_products(PRODUCTS)
+        assert (stats['inserted'], stats['updated'], stats['skipped']) == (0, 0, len(PRODUCTS))
+        assert str(Product.query.filter_by(slug='menta-alpina').one().price) == '12.00'
+        assert seed_products(PRODUCTS, overwrite=True)['updated'] == 1
+        assert str(Product.query.filter_by(slug='menta-alpina').one().price) == '8.90'
+
+
+def test_jsonl_export_keeps_exact_prices(app):
+    run_import(app, 'slug,name,price\ncaro,Caro,12345678.91\n')
+    out = io.StringIO()
+    with app.app_context():
+        export_file(out, 'jsonl')
+    prices = {r['slug']: r['price'] for r in map(json.loads, out.getvalue().splitlines())}
+    assert prices['caro'] == '12345678.91' and prices['menta-alpina'] == '8.90'
+
+
+def test_failed_batch_still_bumps_version_of_committed_ones(app, monkeypatch):
+    calls = []
+    real = catalog_io.apply_batch
+
+    def second_fails(*args):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError('lote roto')
+        real(*args)
+    monkeypatch.setattr(catalog_io, 'apply_batch', second_fails)
+    with app.app_context():
+        before = read_catalog_version()
+    with pytest.raises(RuntimeError):
+        run_import(app, 'slug,name,price\nuno,Uno,1.00\ndos,Dos,2.00\n', batch_size=1)
+    with app.app_context():
+        assert Product.query.filter_by(slug='uno').count() == 1
+        assert read_catalog_version() > before
@@ -0,0 +1,38 @@
+import base64, json
+import pytest
+from catalog_query import decode_cursor, encode_cursor
+
+
+def cursor(*parts):
+    return base64.urlsafe_b64encode(json.dumps(parts).encode()).decode().rstrip('=')
+
+
+def test_cursor_round_trip():
+    value, last_id = decode_cursor(encode_cursor('price', '8.90', 7), 'price')
+    assert (str(value), last_id) == ('8.90', 7)
+
+
+@pytest.mark.parametrize('raw', ['%%%', cursor('price', 'abc', 1), cursor('price', None, 1),
+                                 cursor('price', 'NaN', 1), cursor('price', '1', 'x'), cursor('price', '1')])
+def test_bad_price_cursor_is_value_error(raw):
+    with pytest.raises(ValueError):
+        decode_cursor(raw, 'price')
+
+
+def test_bad_cursor_is_400(client):
+    for raw in (cursor('price', 'abc', 1), cursor('price', None, 1), cursor('id', None, 1)):
+        r = client.get('/api/products', query_string={'sort': 'price', 'cursor': raw})
+        assert r.status_code == 400, raw
+
+
+@pytest.mark.parametrize('raw', ['NaN', 'Infinity', '-inf', 'sNaN', 'abc'])
+def test_bad_price_filter_is_400(client, raw):
+    for key in ('min_price', 'max_price'):
+        assert client.get('/api/products', query_string={key: raw}).status_code == 400, (key, raw)
+
+
+def test_pages_follow_cursor(client):
+    first = client.get('/api/products?sort=price&limit=3').get_json()
+    second = client.get('/api/products', query_string={'sort': 'price', 'limit': 3,
+                                                        'cursor': first['next_cursor']}).get_json()
+    assert {p['id'] for p in first['items']}.isdisjoint(p['id'] for p in second['items'])
@@ -0,0 +1,107 @@
+import time
+from types import SimpleNamespace
+import stripe
+import stripe_client
+from flask_jwt_extended import decode_token
+from app import create_app
+from bench import stock_contention
+from models import db, Product, StockReservation
+from orders import create_order_from_session, handle_stripe_event
+
+
+def stocked_cart(app, client, auth, pid, stock=2, qty=2):
+    with app.app_context():
+        db.session.get(Product, pid).stock = stock
+        db.session.commit()
+    client.post('/api/cart', json={'product_id': pid, 'qty': qty}, headers=auth)
+
+
+def held(app):
+    with app.app_context():
+        return [(r.product_id, r.qty) for r in StockReservation.query.filter_by(status='held')]
+
+
+def test_retry_on_another_worker_reuses_session(app, client, auth, products, monkeypatch):
+    stocked_cart(app, client, auth, products[0])
+    first = client.post('/api/checkout/session', json={}, headers=auth)
+    assert first.status_code == 200
+    # Dos minutos después, otro worker (sin la URL en su caché) recibe el reintento
+    later = time.time() + 120
+    monkeypatch.setattr(stripe_client, 'time', SimpleNamespace(time=lambda: later))
+    retry = create_app().test_client().post('/api/checkout/session', json={}, headers=auth)
+    assert retry.status_code == 200, retry.get_json()
+    assert retry.get_json()['url'] == first.get_json()['url']
+    assert held(app) == [(products[0], 2)]
+
+
+def test_failed_retry_keeps_the_live_hold(app, client, auth, products, monkeypatch):
+    stocked_cart(app, client, auth, products[0])
+    assert client.post('/api/checkout/session', json={}, headers=auth).status_code == 200
+
+    def down(**kwargs):
+        raise stripe.APIConnectionError('Stripe caído')
+    monkeypatch.setattr(stripe.checkout.Session, 'create', down)
+    retry = create_app().test_client().post('/api/checkout/session', json={}, headers=auth)
+    assert retry.status_code == 500
+    assert held(app) == [(products[0], 2)]
+    with app.app_context():
+        assert db.session.get(Product, products[0]).stock == 0
+
+
+def test_failed_first_attempt_releases_its_hold(app, client, auth, products, monkeypatch):
+    stocked_cart(app, client, auth, products[0])
+
+    def down(**kwargs):
+        raise stripe.APIConnectionError('Stripe caído')
+    monkeypatch.setattr(stripe.checkout.Session, 'create', down)
+    assert client.post('/api/checkout/session', json={}, headers=auth).status_code == 500
+    assert held(app) == []
+    with app.app_context():
+        assert db.session.get(Product, products[0]).stock == 2
+
+
+def test_rebuying_a_paid_cart_gets_a_new_reservation(app, client, auth, products):
+    pid = products[0]
+    stocked_cart(app, client, auth, pid, stock=5)
+    first = client.post('/api/checkout/session', json={}, headers=auth).get_json()['url']
+    with app.app_context():
+        old = db.session.query(StockReservation.ref).filter_by(status='held').scalar()
+        uid = int(decode_token(auth['Authorization'][7:])['sub'])
+        create_order_from_session({'id': 'cs_paid', 'metadata': {'user_id': str(uid), 'reservation': old}})
+
+    # Mismo carrito otra vez, dentro del TTL de la caché de URLs
+    client.post('/api/cart', json={'product_id': pid, 'qty': 2}, headers=auth)
+    second = client.post('/api/checkout/session', json={}, headers=auth).get_json()['url']
+    assert second != first
+    with app.app_context():
+        assert db.session.get(Product, pid).stock == 1
+        # El expired tardío de la sesión ya pagada no libera la reserva nueva
+        handle_stripe_event({'type': 'checkout.session.expired',
+                             'data': {'object': {'metadata': {'reservation': old}}}})
+        assert db.session.get(Product, pid).stock == 1
+    assert held(app) == [(pid, 2)]
+
+
+def test_paying_a_replaced_session_does_not_oversell(app, client, auth, products):
+    pid = products[0]
+    stocked_cart(app, client, auth, pid)
+    client.post('/api/checkout/session', json={}, headers=auth)
+    with app.app_context():
+        old = db.session.query(StockReservation.ref).filter_by(status='held').scalar()
+    # Cambia el carrito y abre otro checkout: la reserva vieja se libera y la nueva se lleva el stock
+    client.post('/api/cart', json={'product_id': products[1], 'qty': 1}, headers=auth)
+    client.post('/api/checkout/session', json={}, headers=auth)
+    with app.app_context():
+        new = db.session.query(StockReservation.ref).filter_by(status='held').distinct().scalar()
+        # ... pero la sesión vieja se paga igual
+        late = create_order_from_session({'id': 'cs_old', 'metadata': {'reservation': old}})
+        assert late.status == 'oversold'
+        assert db.session.get(Product, pid).stock == 0
+        assert create_order_from_session({'id': 'cs_new', 'metadata': {'reservation': new}}).status == 'paid'
+        assert db.session.get(Product, pid).stock == 0
+
+
+def test_concurrent_reservations_sell_exactly_the_stock(app):
+    report = stock_contention.bench(threads=8, attempts=40, stock=10, qty=1)
+    assert report['sold'] == 10 and report['stock_left'] == 0
+    assert not report['oversold'] and report['ok'], report
@@ -0,0 +1,22 @@
+import gzip
+import compression
+
+
+def test_catalog_gzip_uses_weak_etag_and_revalidates(client):
+    plain = client.get('/api/products')
+    r = client.get('/api/products', headers={'Accept-Encoding': 'gzip'})
+    assert r.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in r.headers['Vary']
+    assert gzip.decompress(r.data) == plain.data
+    assert r.headers['ETag'] == 'W/' + plain.headers['ETag']
+    again = client.get('/api/products', headers={'Accept-Encoding': 'gzip', 'If-None-Match': r.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_catalog_body_is_compressed_once(client, monkeypatch):
+    calls = []
+    real = compression._compress
+    monkeypatch.setattr(compression, '_compress', lambda *a: calls.append(a[1]) or real(*a))
+    bodies = {client.get('/api/products', headers={'Accept-Encoding': 'gzip'}).data for _ in range(3)}
+    assert len(bodies) == 1
+    assert calls == ['gzip']
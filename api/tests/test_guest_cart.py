@@ -0,0 +1,34 @@
+import pytest
+from app import create_app
+from guest_cart import COOKIE_NAME
+from models import CartItem
+
+
+def test_cart_survives_switching_workers(app, products):
+    # Sin almacén compartido y con 2 workers (por defecto) las líneas van en la cookie
+    worker_a, worker_b = app.test_client(), create_app().test_client()
+    r = worker_a.post('/api/guest/cart', json={'product_id': products[0], 'qty': 2})
+    assert r.status_code == 201
+    worker_b.set_cookie(COOKIE_NAME, worker_a.get_cookie(COOKIE_NAME).value)
+    r = worker_b.patch('/api/guest/cart', json={'ops': [{'op': 'add', 'product_id': products[1], 'qty': 1}]})
+    assert r.get_json()['item_count'] == 3
+    worker_a.set_cookie(COOKIE_NAME, worker_b.get_cookie(COOKIE_NAME).value)
+    assert worker_a.get('/api/guest/cart').get_json()['item_count'] == 3
+
+
+def test_tampered_cookie_is_an_empty_cart(client, products):
+    client.post('/api/guest/cart', json={'product_id': products[0], 'qty': 2})
+    client.set_cookie(COOKIE_NAME, client.get_cookie(COOKIE_NAME).value[:-2] + 'xx')
+    assert client.get('/api/guest/cart').get_json()['item_count'] == 0
+
+
+@pytest.mark.parametrize('workers', ['1', '2'])
+def test_login_merges_guest_cart(app, client, auth, products, monkeypatch, workers):
+    monkeypatch.setenv('WEB_CONCURRENCY', workers)
+    guest = create_app().test_client()
+    guest.post('/api/guest/cart', json={'product_id': products[0], 'qty': 2})
+    r = guest.post('/api/auth/login', json={'email': 'ana@example.com', 'password': 'secret1'})
+    assert r.get_json()['cart_merged'] == 1
+    assert guest.get_cookie(COOKIE_NAME) is None
+    with app.app_context():
+        assert [(ci.product_id, ci.qty) for ci in CartItem.query] == [(products[0], 2)]
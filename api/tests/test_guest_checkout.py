@@ -0,0 +1,19 @@
+from guest_cart import COOKIE_NAME
+
+
+def checkout(client, items):
+    return client.post('/api/checkout/session_guest', json={'items': items})
+
+
+def test_guests_without_cookie_get_their_own_session(app, products):
+    items = [{'product_id': products[0], 'qty': 1}]
+    first, second = app.test_client(), app.test_client()
+    a = checkout(first, items)
+    b = checkout(second, items)
+    assert a.status_code == b.status_code == 200
+    assert a.get_json()['url'] != b.get_json()['url']
+    assert first.get_cookie(COOKIE_NAME) and second.get_cookie(COOKIE_NAME)
+    # El reintento del mismo cliente (ya con cookie) reutiliza su sesión
+    again = checkout(first, items)
+    assert again.get_json()['url'] == a.get_json()['url']
+    assert 'Set-Cookie' not in again.headers
@@ -0,0 +1,47 @@
+import os, re, subprocess, sys
+import pytest
+from sqlalchemy import text
+from app import create_app
+from models import db
+from conftest import API_DIR
+
+WORKER = '''
+import sys
+from app import create_app
+app = create_app()
+c = app.test_client()
+for _ in range(int(sys.argv[1])):
+    c.get('/api/health')
+if len(sys.argv) > 2:
+    sys.stdout.write(c.get('/api/metrics', headers={'Authorization': 'Bearer t'}).get_data(as_text=True))
+'''
+
+
+def test_scrape_sums_every_worker(tmp_path):
+    env = {**os.environ, 'PROMETHEUS_MULTIPROC_DIR': str(tmp_path), 'METRICS_TOKEN': 't',
+           'DATABASE_URL': f"sqlite:///{tmp_path / 'm.db'}"}
+    run = lambda *args: subprocess.run([sys.executable, '-c', WORKER, *args], cwd=API_DIR, env=env,
+                                       capture_output=True, text=True, check=True).stdout
+    run('3')
+    out = run('2', 'scrape')  # otro worker: ve también los 3 del primero
+    n = re.search(r'http_requests_total\{endpoint="/api/health",method="GET",status="200"\} (\S+)', out)
+    assert n and float(n.group(1)) == 5, out
+
+
+def test_metrics_need_a_token(app, monkeypatch):
+    assert app.test_client().get('/api/metrics').status_code == 404  # sin METRICS_TOKEN
+    monkeypatch.setenv('METRICS_TOKEN', 't')
+    c = create_app().test_client()
+    assert c.get('/api/metrics').status_code == 401
+    r = c.get('/api/metrics', headers={'Authorization': 'Bearer t'})
+    assert r.status_code == 200 and b'http_requests_total' in r.data
+
+
+def test_failed_statement_leaves_nothing_on_the_connection(app):
+    with app.app_context():
+        with db.engine.connect() as conn:
+            for _ in range(3):
+                with pytest.raises(Exception):
+                    conn.execute(text('SELECT * FROM no_such_table'))
+            assert conn.execute(text('SELECT 1')).scalar() == 1
+            assert not conn.info.get('query_start')
@@ -0,0 +1,40 @@
+import random
+from models import db, CartItem, CheckoutLine, Order, Product, User
+from orders import create_order_from_session
+from seed_products import synthetic_products
+
+
+def test_order_uses_charged_prices_for_large_carts(app, client, auth):
+    with app.app_context():
+        db.session.add_all(Product(**p) for p in synthetic_products(80, random.Random(2)))
+        db.session.commit()
+        uid = db.session.query(User.id).filter_by(email='ana@example.com').scalar()
+        pids = [p for p, in db.session.query(Product.id).order_by(Product.id).limit(80)]
+        db.session.add_all(CartItem(user_id=uid, product_id=pid, qty=1) for pid in pids)
+        db.session.commit()
+
+    r = client.post('/api/checkout/session', json={}, headers=auth)
+    assert r.status_code == 200, r.get_json()
+
+    with app.app_context():
+        ref = db.session.query(CheckoutLine.ref).distinct().scalar()
+        charged = {l.product_id: l.unit_amount for l in CheckoutLine.query.filter_by(ref=ref)}
+        assert len(charged) == 80
+        Product.query.filter_by(id=pids[0]).one().price = 99  # cambia tras pagar, antes del webhook
+        db.session.commit()
+
+        order = create_order_from_session({
+            'id': 'cs_test_1', 'amount_total': sum(charged.values()), 'currency': 'chf',
+            'metadata': {'user_id': str(uid), 'reservation': ref},
+        })
+        assert len(order.lines) == 80
+        assert {l.product_id: l.unit_amount for l in order.lines} == charged
+        assert CartItem.query.filter_by(user_id=uid).count() == 0
+        assert create_order_from_session({'id': 'cs_test_1', 'metadata': {}}) is None
+        assert Order.query.count() == 1
+
+
+def test_legacy_cart_metadata_still_creates_lines(app, products):
+    with app.app_context():
+        order = create_order_from_session({'id': 'cs_old', 'metadata': {'cart': f'{products[0]}:2'}})
+        assert [(l.product_id, l.qty) for l in order.lines] == [(products[0], 2)]
@@ -0,0 +1,77 @@
+import shutil
+import pytest
+from sqlalchemy import event
+from app import create_app
+from models import db, Product
+
+
+@pytest.fixture
+def replica(app, tmp_path, monkeypatch, auth):
+    """App con réplica: copia del primario (con el usuario ya registrado) en otro SQLite."""
+    with app.app_context():
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)')
+        db.engine.dispose()
+    shutil.copy(tmp_path / 'test.db', tmp_path / 'replica.db')
+    monkeypatch.setenv('READ_REPLICA_URL', f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setenv('WEB_CONCURRENCY', '1')
+    monkeypatch.setenv('REPLICA_CHECK_INTERVAL', '0')
+    routed = create_app()
+    counts = {}
+    with routed.app_context():
+        for key, engine in db.engines.items():
+            event.listen(engine, 'before_cursor_execute',
+                         lambda *args, key=key or 'primary': counts.__setitem__(key, counts.get(key, 0) + 1))
+    yield routed, counts
+    with routed.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def used(counts, fn):
+    counts.clear()
+    r = fn()
+    assert r.status_code < 400, r.get_json()
+    return r, set(k for k, n in counts.items() if n)
+
+
+def test_catalog_and_profile_reads_hit_replica(replica, auth):
+    routed, counts = replica
+    c = routed.test_client()
+    for path in ('/api/products', '/api/products/menta-alpina', '/api/products/search?q=menta'):
+        _, engines = used(counts, lambda: c.get(path))
+        assert 'replica' in engines, path
+    _, engines = used(counts, lambda: c.get('/api/me', headers=auth))
+    assert 'replica' in engines
+    # El carrito no está en la lista: siempre primario
+    _, engines = used(counts, lambda: c.get('/api/cart', headers=auth))
+    assert engines == {'primary'}
+
+
+def test_read_after_write_stays_on_primary(replica, auth):
+    routed, counts = replica
+    c = routed.test_client()
+    c.get('/api/me', headers=auth)
+    assert c.put('/api/me', json={'name': 'Ana B'}, headers=auth).status_code == 200
+    r, engines = used(counts, lambda: c.get('/api/me', headers=auth))
+    assert 'replica' not in engines
+    assert r.get_json()['name'] == 'Ana B'
+
+
+def test_stale_catalog_falls_back_to_primary(replica):
+    routed, counts = replica
+    c = routed.test_client()
+    with routed.app_context():
+        Product.query.filter_by(slug='menta-alpina').one().price = 12.40
+        db.session.commit()  # solo en el primario: el réplica queda atrasado
+    r, engines = used(counts, lambda: c.get('/api/products/menta-alpina'))
+    assert str(r.get_json()['price']) == '12.4'
+    assert counts.get('replica', 0) <= 1  # como mucho, la comprobación de versión
+
+
+def test_replica_requires_shared_pins_with_several_workers(app, tmp_path, monkeypatch):
+    monkeypatch.setenv('READ_REPLICA_URL', f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setenv('WEB_CONCURRENCY', '2')
+    monkeypatch.delenv('REPLICA_PIN_STORE_URL', raising=False)
+    with pytest.raises(RuntimeError, match='REPLICA_PIN_STORE_URL'):
+        create_app()
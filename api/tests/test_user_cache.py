@@ -0,0 +1,46 @@
+import pytest
+from app import create_app
+from kvstore import MemoryStore
+from models import db, User
+from user_cache import UserCache
+
+
+def bearer(token):
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def two_workers(app, monkeypatch):
+    monkeypatch.setenv('USER_CACHE_TTL', '60')
+    return create_app().test_client(), create_app().test_client()
+
+
+def test_password_change_revokes_on_every_worker(two_workers, auth):
+    worker_a, worker_b = two_workers
+    assert worker_b.get('/api/me', headers=auth).status_code == 200  # B cachea el usuario
+    r = worker_a.put('/api/me', headers=auth, json={'current_password': 'secret1', 'new_password': 'secret2'})
+    new = bearer(r.get_json()['access_token'])
+    assert worker_b.get('/api/me', headers=new).status_code == 200
+    assert worker_b.get('/api/me', headers=auth).status_code == 401
+    assert worker_a.get('/api/me', headers=auth).status_code == 401
+
+
+def test_deleted_user_is_revoked_on_every_worker(two_workers, auth):
+    worker_a, worker_b = two_workers
+    assert worker_b.get('/api/me', headers=auth).status_code == 200
+    assert worker_a.delete('/api/me', headers=auth).status_code == 200
+    assert worker_b.get('/api/me', headers=auth).status_code == 401
+
+
+def test_shared_versions_store(app, auth):
+    shared = MemoryStore()
+    a, b = UserCache(ttl=60, versions=shared), UserCache(ttl=60, versions=shared)
+    with app.app_context():
+        uid = db.session.query(User.id).scalar()
+        assert a.token_version(uid) == b.token_version(uid) == 0
+        db.session.get(User, uid).token_version = 1
+        db.session.commit()
+        a.bump(uid, 1)
+        assert b.token_version(uid) == 1  # sin esperar al TTL de la caché de b
+        a.bump(uid, None)
+        assert b.token_version(uid) == -1
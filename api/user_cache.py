@@ -0,0 +1,67 @@
+import threading, time
+from sqlalchemy import select
+from models import db, User
+
+
+def user_dict(u: User):
+    return {
+        'id': u.id, 'name': u.name, 'email': u.email,
+        'created_at': u.created_at.isoformat() if u.created_at else None,
+        'token_version': u.token_version or 0,
+    }
+
+
+class UserCache:
+    """Caché id -> datos públicos del usuario con TTL (una por worker).
+
+    Se invalida explícitamente en este worker al modificar/borrar el usuario; en
+    los demás workers el perfil cambiado se ve como mucho `ttl` segundos después.
+
+    La revocación de tokens no puede esperar ese TTL. `token_version` sale de:
+    - `versions` (almacén compartido, redis://) si lo hay: `bump` publica el cambio;
+    - la BD (una columna por PK) si `check_db`: varios workers sin almacén compartido;
+    - la caché en los demás casos (un solo worker: la invalidación explícita basta).
+    """
+
+    def __init__(self, ttl=60, versions=None, check_db=False):
+        self.ttl = ttl
+        self.versions = versions
+        self.check_db = check_db
+        self._lock = threading.Lock()
+        self._users = {}  # uid -> (dict | None, expira)
+
+    def get(self, uid, fresh=False):
+        now = time.monotonic()
+        hit = self._users.get(uid)
+        if hit and hit[1] > now and not fresh:
+            return hit[0]
+        u = db.session.get(User, uid)
+        data = user_dict(u) if u else None
+        with self._lock:
+            if len(self._users) > 10000:
+                self._users = {k: v for k, v in self._users.items() if v[1] > now}
+            self._users[uid] = (data, now + self.ttl)
+        return data
+
+    def token_version(self, uid, fresh=False):
+        """token_version vigente de `uid`; None si el usuario no existe."""
+        if not fresh and self.versions is not None:
+            raw = self.versions.get(f'tv:{uid}')
+            if raw is not None:
+                return int(raw)
+        if self.check_db and not fresh:
+            row = db.session.execute(select(User.token_version).where(User.id == uid)).first()
+            return None if row is None else row[0] or 0
+        u = self.get(uid, fresh=fresh)
+        return u and u['token_version']
+
+    def bump(self, uid, token_version):
+        """Tras cambiar token_version o borrar el usuario (None): invalida y lo publica."""
+        self.invalidate(uid)
+        if self.versions is not None:
+            # Más que el TTL de la caché: pasado ese tiempo ningún worker tiene el valor viejo
+            self.versions.set(f'tv:{uid}', -1 if token_version is None else token_version, ttl=self.ttl + 60)
+
+    def invalidate(self, uid):
+        with self._lock:
+            self._users.pop(uid, None)
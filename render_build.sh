@@ -7,4 +7,8 @@ npm run build
 
 pipenv install
 
+# .gz/.br junto a cada asset para servirlos sin comprimir en cada petición
+# (después de instalar: el módulo importa flask y brotli)
+pipenv run python api/compression.py dist
+
 pipenv run upgrade
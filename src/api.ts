@@ -62,3 +62,9 @@ export function absoluteFromApi(pathOrUrl: string) {
   if (pathOrUrl.startsWith('/')) return `${API_ORIGIN}${pathOrUrl}`;
   return `${API_BASE.replace(/\/api$/, '')}/${pathOrUrl}`;
 }
+/** Variante reducida (ancho 160/320/640/1024, WebP si el navegador lo acepta) de una imagen de producto */
+export function productImage(path: string | undefined, width: number) {
+  if (!path) return '';
+  const sep = path.includes('?') ? '&' : '?';
+  return `${API_ORIGIN}${path}${sep}w=${width}&fm=auto`;
+}
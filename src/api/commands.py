@@ -1,6 +1,9 @@
 
-import click
+import click, time
 from api.models import db, User
+from api.shared import load_shared
+
+insert_batches = load_shared('bulk').insert_batches  # el mismo camino que seed_products
 
 """
 In this file, you can add as many commands as you want using the @app.cli.command decorator
@@ -15,19 +18,16 @@ def setup_commands(app):
     Note: 5 is the number of users to add
     """
     @app.cli.command("insert-test-users") # name of our command
-    @click.argument("count") # argument of out command
-    def insert_test_users(count):
+    @click.argument("count", type=int) # argument of out command
+    @click.option("--batch-size", type=int, default=1000, show_default=True)
+    def insert_test_users(count, batch_size):
         print("Creating test users")
-        for x in range(1, int(count) + 1):
-            user = User()
-            user.email = "test_user" + str(x) + "@test.com"
-            user.password = "123456"
-            user.is_active = True
-            db.session.add(user)
-            db.session.commit()
-            print("User: ", user.email, " created.")
-
-        print("All test users created")
+        start = time.perf_counter()
+        rows = ({"email": f"test_user{x}@test.com", "password": "123456", "is_active": True}
+                for x in range(1, count + 1))
+        n = insert_batches(db.session, User, rows, batch_size, commit=True)
+        elapsed = time.perf_counter() - start
+        print(f"All test users created: {n} in {elapsed:.2f}s ({n / elapsed if elapsed else n:.0f}/s)")
 
     @app.cli.command("insert-test-data")
     def insert_test_data():
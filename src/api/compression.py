@@ -0,0 +1,10 @@
+# Misma implementación que la API principal: api/compression.py
+from api.shared import load_shared
+
+_compression = load_shared('compression')
+COMPRESSIBLE = _compression.COMPRESSIBLE
+SIBLINGS = _compression.SIBLINGS
+accepted_encodings = _compression.accepted_encodings
+init_compression = _compression.init_compression
+send_precompressed = _compression.send_precompressed
+precompress_tree = _compression.precompress_tree
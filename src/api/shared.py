@@ -0,0 +1,18 @@
+"""Carga módulos sin dependencias de la API principal (api/*.py) en vez de copiarlos.
+
+`api` aquí es el paquete de src/, así que api/compression.py y compañía no se pueden
+importar por nombre: se cargan por ruta como `senda_<nombre>`.
+"""
+import importlib.util, os, sys
+
+SHARED_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'api')
+
+
+def load_shared(name):
+    module_name = f'senda_{name}'
+    if module_name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(SHARED_DIR, f'{name}.py'))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[module_name]
@@ -0,0 +1,72 @@
+import mimetypes, os, re, threading, time
+from flask import abort, request, send_file
+from api.compression import COMPRESSIBLE, SIBLINGS, accepted_encodings
+
+# Vite: assets/index-3f9a1c2b.js, assets/logo-Bx8_kQ2z.svg ...
+HASHED_RE = re.compile(r'(^|/)assets/.+-[A-Za-z0-9_-]{8,}\.[a-z0-9]+$')
+IMMUTABLE_MAX_AGE = 31536000
+
+
+class StaticIndex:
+    """Índice en memoria de dist/: sin os.path.isfile por petición.
+
+    Guarda, para cada fichero, qué hermanos precomprimidos (.br/.gz) existen.
+    Con `reload_interval` > 0 se vuelve a escanear como mucho cada N segundos
+    (útil en desarrollo mientras `vite build --watch` reescribe dist/).
+    """
+
+    def __init__(self, root, reload_interval=0):
+        self.root = os.path.realpath(root)
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._files = {}
+        self._scanned_at = 0.0
+        self.scan()
+
+    def scan(self):
+        files = {}
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                rel = os.path.relpath(os.path.join(dirpath, name), self.root).replace(os.sep, '/')
+                files[rel] = set()
+        for rel in list(files):
+            for encoding, ext in SIBLINGS:
+                if rel.endswith(ext) and rel[:-len(ext)] in files:
+                    files[rel[:-len(ext)]].add(encoding)
+        with self._lock:
+            self._files = files
+            self._scanned_at = time.monotonic()
+
+    def lookup(self, path):
+        if self.reload_interval and time.monotonic() - self._scanned_at > self.reload_interval:
+            self.scan()
+        return self._files.get(path)
+
+    def send(self, path):
+        """Sirve `path` si está en el índice; si no, index.html (rutas del SPA)."""
+        encodings = self.lookup(path)
+        if encodings is None:
+            path, encodings = 'index.html', self.lookup('index.html')
+            if encodings is None:
+                abort(404)  # sin build de frontend
+        mimetype = mimetypes.guess_type(path)[0]
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding')) if encodings else ()
+        encoding = next((e for e, _ in SIBLINGS if e in encodings and e in accepted), None)
+        ext = dict(SIBLINGS)[encoding] if encoding else ''
+        response = send_file(os.path.join(self.root, path + ext), mimetype=mimetype, conditional=True)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if mimetype in COMPRESSIBLE:
+            response.vary.add('Accept-Encoding')
+
+        if HASHED_RE.search(path):
+            # El nombre cambia con el contenido: se puede cachear para siempre
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            # index.html y demás: siempre revalidar (ETag/Last-Modified -> 304)
+            response.cache_control.no_cache = True
+            response.cache_control.max_age = 0
+        return response
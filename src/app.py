@@ -2,7 +2,7 @@
 This module takes care of starting the API Server, Loading the DB and Adding the endpoints
 """
 import os
-from flask import Flask, request, jsonify, url_for, send_from_directory
+from flask import Flask, request, jsonify, url_for
 from flask_migrate import Migrate
 from flask_swagger import swagger
 from api.utils import APIException, generate_sitemap
@@ -10,6 +10,8 @@ from api.models import db
 from api.routes import api
 from api.admin import setup_admin
 from api.commands import setup_commands
+from api.compression import init_compression
+from api.static_files import StaticIndex
 
 # from models import Person
 
@@ -37,6 +39,13 @@ setup_admin(app)
 # add the admin
 setup_commands(app)
 
+# gzip/brotli para respuestas de texto; los estáticos usan los .br/.gz del build
+init_compression(app, min_size=int(os.getenv('COMPRESS_MIN_SIZE', '1024')))
+
+# dist/ se indexa una vez al arrancar (en desarrollo se re-escanea cada segundo)
+static_index = StaticIndex(static_file_dir, reload_interval=float(
+    os.getenv('STATIC_INDEX_RELOAD', '1' if ENV == "development" else '0')))
+
 # Add all endpoints form the API with a "api" prefix
 app.register_blueprint(api, url_prefix='/api')
 
@@ -54,16 +63,13 @@ def handle_invalid_usage(error):
 def sitemap():
     if ENV == "development":
         return generate_sitemap(app)
-    return send_from_directory(static_file_dir, 'index.html')
+    return static_index.send('index.html')
 
 # any other endpoint will try to serve it like a static file
 @app.route('/<path:path>', methods=['GET'])
 def serve_any_other_file(path):
-    if not os.path.isfile(os.path.join(static_file_dir, path)):
-        path = 'index.html'
-    response = send_from_directory(static_file_dir, path)
-    response.cache_control.max_age = 0  # avoid cache memory
-    return response
+    # assets con hash -> inmutables; index.html y rutas del SPA -> revalidar
+    return static_index.send(path)
 
 
 # this only runs if `$ python src/main.py` is executed
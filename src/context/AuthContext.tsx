@@ -63,7 +63,13 @@ export function AuthProvider({ children }: { children: ReactNode }) {
   }
 
   const updateMe = async (payload: { name?: string; email?: string; current_password?: string; new_password?: string }) => {
-    await api.put('/me', payload)
+    const { data } = await api.put('/me', payload)
+    // Al cambiar la contraseña el backend revoca los tokens anteriores y devuelve uno nuevo
+    if (data?.access_token) {
+      setToken(data.access_token)
+      api.defaults.headers.common['Authorization'] = `Bearer ${data.access_token}`
+      localStorage.setItem('token', data.access_token)
+    }
     await refreshMe()
   }
 
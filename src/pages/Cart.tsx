@@ -3,7 +3,7 @@ import PaymentIcons from "../components/PaymentIcons";
 import { Link, useNavigate } from "react-router-dom";
 import { useCart } from "../context/CartContext";
 import { useAuth } from "../context/AuthContext";
-import { API_ORIGIN } from "../api";
+import { productImage } from "../api";
 
 export default function Cart() {
   // Usamos "any" para ser resilientes a diferencias de tipado/props del contexto
@@ -193,7 +193,7 @@ export default function Cart() {
                 >
                   <img
                     alt={line.product.name}
-                    src={`${API_ORIGIN}${line.product.image}`}
+                    src={productImage(line.product.image, 160)}
                     style={{
                       width: 96,
                       height: 96,
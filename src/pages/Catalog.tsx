@@ -2,7 +2,7 @@ import { Link } from "react-router-dom"
 import { cardColorsFor } from "../lib/cardPalette"
 import { useProducts } from "../context/ProductsContext"
 import { useCart } from "../context/CartContext"
-import { API_ORIGIN } from "../api"
+import { productImage } from "../api"
 
 export default function Catalog() {
   const { products, loading, error, refresh } = useProducts()
@@ -42,7 +42,7 @@ export default function Catalog() {
           >
             <Link to={`/product/${p.slug}`} style={{ display: "block" }}>
               <img
-                src={`${API_ORIGIN}${p.image}`}
+                src={productImage(p.image, 640)}
                 alt={p.name}
                 style={{ width: "100%", height: 220, objectFit: "cover" }}
               />
@@ -24,9 +24,22 @@ export type CartItem = {
   qty: number
   product: CartProduct
   line_total: number
+  line_total_minor: number
 }
 
 export type CartResponse = {
   items: CartItem[]
   subtotal: number
+  subtotal_minor: number
+  item_count: number
+  currency: string
+}
+
+/** GET /api/cart/summary: totales sin detalle de productos (importes en céntimos) */
+export type CartSummary = {
+  line_count: number
+  item_count: number
+  subtotal_minor: number
+  subtotal: string
+  currency: string
 }